@@ -1,25 +1,67 @@
 # app.py - Main Flask Application
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file
-import pandas as pd
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, Response, \
+    stream_with_context, stream_template, session, g
+import asyncio
+import gzip
+import importlib.util
 import json
+import mmap
 import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
 import uuid
-from datetime import datetime, date
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import make_dataclass
+from datetime import datetime, date, timedelta
 from werkzeug.utils import secure_filename
 import csv
 from functools import wraps
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def lazy_import(name):
+    """Import a module on first attribute access instead of now"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# pandas dominates import time. It is loaded by TMSDataManager.ensure_ready,
+# under its lock, since a lazy module must not be first touched from several
+# threads at once
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
 app = Flask(__name__)
 app.secret_key = 'tms_secret_key_2024'
 
 # Configuration
 DATA_DIR = "tms_data"
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'csv', 'json'}
+ALLOWED_EXTENSIONS = {'csv', 'json', 'gz'}
 
-# Ensure directories exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Number of full and incremental backups kept in UPLOAD_FOLDER
+BACKUP_RETENTION_COUNT = 14
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
@@ -32,105 +74,1749 @@ OTR_FILE = os.path.join(DATA_DIR, "otr_repairs.csv")
 PM_FILE = os.path.join(DATA_DIR, "pm_records.csv")
 SHOP_JOBS_FILE = os.path.join(DATA_DIR, "shop_jobs.csv")
 
+# Primary key column of each table
+TABLE_ID_COLUMNS = {
+    'drivers': 'driver_id',
+    'trucks': 'truck_id',
+    'trailers': 'trailer_id',
+    'maintenance': 'maintenance_id',
+    'otr_repairs': 'otr_id',
+    'pm_records': 'pm_id',
+    'shop_jobs': 'job_id',
+}
+
+# Append-only change log (one JSON object per line). Once it grows past
+# CHANGE_LOG_MAX_BYTES it is moved to CHANGE_LOG_ARCHIVE_DIR and a new log is
+# started; the newest CHANGE_LOG_RETENTION archived logs are kept
+CHANGE_LOG_FILE = os.path.join(DATA_DIR, "changes.jsonl")
+CHANGE_LOG_ARCHIVE_DIR = os.path.join(DATA_DIR, "changes")
+CHANGE_LOG_MAX_BYTES = 8 * 1024 * 1024
+CHANGE_LOG_RETENTION = 10
+
+# Table name -> data file (names match the keys used by /export and /import)
+TABLE_FILES = {
+    'drivers': DRIVERS_FILE,
+    'trucks': TRUCKS_FILE,
+    'trailers': TRAILERS_FILE,
+    'maintenance': MAINTENANCE_FILE,
+    'otr_repairs': OTR_FILE,
+    'pm_records': PM_FILE,
+    'shop_jobs': SHOP_JOBS_FILE,
+}
+TABLE_NAMES = {file_path: table for table, file_path in TABLE_FILES.items()}
+
+# Dashboard live updates
+DASHBOARD_POLL_SECONDS = 2.0
+DASHBOARD_KEEPALIVE_SECONDS = 15.0
+# Each open dashboard holds a server connection (a thread under WSGI). Turn the
+# stream off (TMS_DASHBOARD_STREAM=0) on servers where that blocks a whole
+# worker, such as gunicorn's default sync workers
+DASHBOARD_STREAM = os.environ.get('TMS_DASHBOARD_STREAM', '1') != '0'
+
+# Bounded pool used for off-thread table loads (ASGI mode, concurrent loads)
+TABLE_LOAD_WORKERS = 4
+
+# Tables already loaded for the current request (filled by the ASGI entry point),
+# keyed by TMSDataManager.cache_key()
+prefetched_tables = ContextVar('prefetched_tables', default=None)
+
+# Per-terminal shards: tms_data/terminals/<terminal>/<table>.csv
+TERMINALS_DIR = os.path.join(DATA_DIR, "terminals")
+TERMINAL_COLUMN = 'terminal'
+
+# Terminal the current request is scoped to (None = company-wide)
+current_terminal = ContextVar('current_terminal', default=None)
+
+# History tables partitioned by month: <table>/<YYYY-MM>_<YYYY-MM>.csv next to <table>.csv
+PARTITION_DATE_COLUMNS = {
+    MAINTENANCE_FILE: 'date',
+    OTR_FILE: 'breakdown_date',
+    PM_FILE: 'date',
+    SHOP_JOBS_FILE: 'date_started',
+}
+PARTITION_NAME = re.compile(r'^(\d{4}-\d{2})_(\d{4}-\d{2})\.csv$')
+
+# Compaction merges adjacent small partitions up to this many rows
+PARTITION_TARGET_ROWS = 5000
+
+# Parsed CSV files published as memory-mapped snapshots shared by all worker
+# processes: tms_data/snapshots/<path of the CSV file>/<size>-<mtime>/
+# (set TMS_TABLE_SNAPSHOTS=0 to parse the CSV files on every load instead)
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+TABLE_SNAPSHOTS = os.environ.get('TMS_TABLE_SNAPSHOTS', '1') != '0'
+# Snapshot columns with more distinct values than this decode them again for every load
+SNAPSHOT_CACHED_VALUES = 10000
+
+# One lock file per table, held (with fcntl, where available) while the table is written
+LOCK_DIR = os.path.join(DATA_DIR, "locks")
+
+# Rows per chunk when filtering a CSV while it is parsed (predicate pushdown)
+CSV_CHUNK_ROWS = 50000
+
+# Rows per page of each history section of the truck/driver/trailer reports
+REPORT_PAGE_ROWS = 200
+
+# Background jobs (import, export, compaction) and their status files.
+# Jobs rewrite whole tables, so they run one at a time.
+JOBS_DIR = os.path.join(DATA_DIR, "jobs")
+JOB_WORKERS = 1
+JOB_RETENTION_COUNT = 100
+
+# Referential integrity: (table, column, referenced table, referenced key
+# columns). Multi-column keys are joined with spaces, like lookup_column.
+# The orphan report is rewritten by every check.
+INTEGRITY_REFERENCES = [
+    ('trucks', 'assigned_driver', 'drivers', ['first_name', 'last_name']),
+    ('trailers', 'assigned_truck', 'trucks', ['truck_number']),
+    ('maintenance', 'truck_id', 'trucks', ['truck_id']),
+    ('maintenance', 'trailer_id', 'trailers', ['trailer_id']),
+    ('otr_repairs', 'truck_id', 'trucks', ['truck_id']),
+    ('otr_repairs', 'driver_id', 'drivers', ['driver_id']),
+    ('pm_records', 'truck_id', 'trucks', ['truck_id']),
+    ('shop_jobs', 'truck_id', 'trucks', ['truck_id']),
+    ('shop_jobs', 'trailer_id', 'trailers', ['trailer_id']),
+]
+INTEGRITY_DIR = os.path.join(DATA_DIR, "integrity")
+ORPHANS_FILE = os.path.join(INTEGRITY_DIR, "orphans.csv")
+INTEGRITY_SUMMARY_FILE = os.path.join(INTEGRITY_DIR, "summary.json")
+INTEGRITY_SAMPLE_ROWS = 100
+
+# Technician capacity used by the shop scheduler
+TECHNICIAN_HOURS_PER_DAY = 8
+TECHNICIAN_HOURS_PER_WEEK = 40
+SHOP_PRIORITIES = ['Critical', 'High', 'Medium', 'Low']
+CLOSED_JOB_STATUSES = {'Completed', 'Cancelled'}
+SCHEDULE_COLUMNS = ['job_id', 'truck_id', 'trailer_id', 'technician', 'labor_hours',
+                    'date_started', 'date_completed', 'status', 'priority']
+
+# Breakdown reliability analytics over the OTR repairs
+RELIABILITY_COLUMNS = ['truck_id', 'breakdown_date', 'issue_description', 'downtime_hours', 'total_cost']
+RELIABILITY_TRUCK_COLUMNS = ['truck_id', 'truck_number', 'make', 'model', 'engine_type']
+RELIABILITY_PERCENTILES = [50, 90, 95, 99]
+RECURRING_ISSUE_MIN = 2
+# Appended breakdown batches kept apart before being concatenated
+RELIABILITY_EVENT_PARTS = 32
+# Issue clusters, matched against the lowercased issue description in order
+ISSUE_CATEGORIES = [
+    ('Tires', r'\btires?\b|blowout|\bflat\b|tread'),
+    ('Brakes', r'brake|air leak|slack adjuster|\babs\b'),
+    ('Emissions', r'\bdef\b|\bdpf\b|\begr\b|\bscr\b|\bnox\b|regen|derate|emission'),
+    ('Electrical', r'alternator|batter|starter|wiring|electrical|fuse|\blights?\b|lamp'),
+    ('Cooling', r'coolant|radiator|overheat|water pump|thermostat|\bfan\b'),
+    ('Fuel', r'\bfuel\b|injector'),
+    ('Engine', r'engine|turbo|\boil\b|cylinder|head gasket'),
+    ('Drivetrain', r'transmission|clutch|drive ?shaft|u-joint|differential|\bgear'),
+    ('Suspension', r'suspension|air ?bag|spring|shock|steering|king ?pin'),
+    ('Body', r'mirror|windshield|door|hood|mud flap|fairing'),
+]
+
+# Columns of each table file
+DRIVER_COLUMNS = [
+    'driver_id', 'first_name', 'last_name', 'license_number',
+    'driver_type', 'hire_date', 'phone', 'email', 'address',
+    'cdl_expiry', 'medical_expiry', 'status', 'notes', 'created_at'
+]
+TRUCK_COLUMNS = [
+    'truck_id', 'truck_number', 'make', 'model', 'year', 'vin',
+    'engine_type', 'mileage', 'assigned_driver', 'status',
+    'purchase_date', 'last_pm_date', 'next_pm_due', 'notes', 'created_at'
+]
+TRAILER_COLUMNS = [
+    'trailer_id', 'trailer_number', 'type', 'year', 'make',
+    'capacity', 'assigned_truck', 'status', 'last_inspection',
+    'next_inspection_due', 'notes', 'created_at'
+]
+MAINTENANCE_COLUMNS = [
+    'maintenance_id', 'truck_id', 'trailer_id', 'maintenance_type',
+    'date', 'mileage', 'description', 'parts_cost', 'labor_cost',
+    'total_cost', 'shop_name', 'shop_location', 'technician',
+    'status', 'notes', 'created_at'
+]
+OTR_COLUMNS = [
+    'otr_id', 'truck_id', 'driver_id', 'breakdown_date', 'location',
+    'issue_description', 'repair_shop', 'repair_cost', 'parts_used',
+    'labor_hours', 'downtime_hours', 'tow_cost', 'hotel_cost',
+    'total_cost', 'insurance_claim', 'status', 'notes', 'created_at'
+]
+PM_COLUMNS = [
+    'pm_id', 'truck_id', 'pm_type', 'date', 'mileage', 'next_due_date',
+    'next_due_mileage', 'shop_name', 'technician', 'oil_change',
+    'filter_change', 'inspection_items', 'parts_cost', 'labor_cost',
+    'total_cost', 'status', 'notes', 'created_at'
+]
+SHOP_JOB_COLUMNS = [
+    'job_id', 'truck_id', 'trailer_id', 'job_type', 'date_started',
+    'date_completed', 'description', 'technician', 'parts_used',
+    'labor_hours', 'parts_cost', 'labor_cost', 'total_cost',
+    'status', 'priority', 'notes', 'created_at'
+]
+
+# Columns needed to build the dropdowns of the add_* forms and the list page joins
+DRIVER_OPTION_COLUMNS = ['driver_id', 'first_name', 'last_name', 'driver_type']
+TRUCK_OPTION_COLUMNS = ['truck_id', 'truck_number', 'make', 'model']
+TRAILER_OPTION_COLUMNS = ['trailer_id', 'trailer_number', 'type']
+
+# Columns get_dashboard_stats reads from each table
+DASHBOARD_STATS_COLUMNS = {
+    'drivers': ['driver_type'],
+    'trucks': ['status'],
+    'trailers': ['status'],
+    'maintenance': ['total_cost'],
+    'otr_repairs': ['status', 'total_cost'],
+    'pm_records': ['pm_id'],
+    'shop_jobs': ['job_id'],
+}
+
+
+class TMSRecord:
+    """Base of the slotted row types used by templates"""
+    __slots__ = ()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build one record per row straight from the DataFrame's column arrays"""
+        fields = cls.__slots__
+        columns = [df[field].tolist() if field in df.columns else [None] * len(df) for field in fields]
+        return [cls(*values) for values in zip(*columns)]
+
+
+def record_type(name, columns, extra_fields=()):
+    """Slotted record class with a field per table column, display field and the terminal tag"""
+    fields = list(dict.fromkeys([*columns, *extra_fields, TERMINAL_COLUMN]))
+    return make_dataclass(name, [(field, object, None) for field in fields], bases=(TMSRecord,),
+                          slots=True, eq=False)
+
+
+Driver = record_type('Driver', DRIVER_COLUMNS)
+Truck = record_type('Truck', TRUCK_COLUMNS)
+Trailer = record_type('Trailer', TRAILER_COLUMNS)
+MaintenanceRecord = record_type('MaintenanceRecord', MAINTENANCE_COLUMNS)
+OTRRepair = record_type('OTRRepair', OTR_COLUMNS, ['truck_number', 'truck_make_model', 'driver_name'])
+PMRecord = record_type('PMRecord', PM_COLUMNS, ['truck_number', 'truck_make_model'])
+ShopJob = record_type('ShopJob', SHOP_JOB_COLUMNS, ['truck_number', 'trailer_number'])
+
+
+class TableSnapshot:
+    """Read-only view of a published table snapshot.
+
+    Every file is mapped with mmap, so all processes share the same pages
+    (and a snapshot stays readable after it is pruned). Numeric and boolean
+    columns are .npy files used as they are. Other columns are stored as
+    int32 codes plus a JSON list of their distinct values, and are decoded
+    into each frame built, like a parsed CSV column, freed with that frame.
+    Only the distinct values of columns with at most SNAPSHOT_CACHED_VALUES
+    of them are kept between loads.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        self.rows = meta['rows']
+        self.names = [column['name'] for column in meta['columns']]
+        self.codes = {}
+        self.value_files = {}
+        self.uniques = {}
+        mapped = {}
+        for index, column in enumerate(meta['columns']):
+            values = np.load(os.path.join(path, f"{index}.npy"), mmap_mode='r')
+            if column['encoding'] == 'values':
+                mapped[column['name']] = values
+            else:
+                self.codes[column['name']] = values
+                with open(os.path.join(path, f"{index}.values.json"), 'rb') as f:
+                    self.value_files[column['name']] = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ),
+                                                        column['dtype'])
+        # Frames built from these columns share them; pandas copies on write
+        self.mapped = pd.DataFrame(mapped, copy=False)
+
+    def values(self, name):
+        """Distinct values of a coded column"""
+        uniques = self.uniques.get(name)
+        if uniques is None:
+            value_file, dtype = self.value_files[name]
+            uniques = pd.array(json.loads(value_file[:]), dtype=dtype)
+            if len(uniques) <= SNAPSHOT_CACHED_VALUES:
+                self.uniques[name] = uniques
+        return uniques
+
+    def column(self, name, rows=None):
+        if name in self.codes:
+            codes = self.codes[name] if rows is None else self.codes[name][rows]
+            return self.values(name).take(codes, allow_fill=True)
+        values = self.mapped[name]
+        return values if rows is None else values.values[rows]
+
+    def matches(self, name, value):
+        """Boolean row mask of column == value (or in [values]), as DataFrame.isin"""
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        if name in self.codes:
+            codes = self.codes[name]
+            return pd.Series(self.values(name)).isin(values).values[codes] & (codes >= 0)
+        return self.mapped[name].isin(values).values
+
+    def select(self, where):
+        """Numbers of the rows matching where, or None for every row"""
+        if not where:
+            return None
+        if any(name not in self.names for name in where):
+            return np.array([], dtype=np.intp)
+        mask = np.ones(self.rows, dtype=bool)
+        for name, value in where.items():
+            mask &= self.matches(name, value)
+        return np.flatnonzero(mask)
+
+    def rows_frame(self, columns, rows):
+        """DataFrame of the given columns (all if None) and rows (all if None)"""
+        names = [name for name in self.names if columns is None or name in columns]
+        length = self.rows if rows is None else len(rows)
+        return pd.DataFrame({name: self.column(name, rows) for name in names}, columns=names,
+                            index=pd.RangeIndex(length), copy=False)
+
+    def frame(self, columns=None, where=None):
+        """DataFrame of the given columns (all by default) and the rows matching where"""
+        return self.rows_frame(columns, self.select(where))
+
+    def chunks(self, columns=None, where=None, chunk_rows=CSV_CHUNK_ROWS):
+        """Yield frame(columns, where) as DataFrames of at most chunk_rows rows"""
+        rows = self.select(where)
+        if rows is None:
+            rows = np.arange(self.rows)
+        for start in range(0, len(rows), chunk_rows):
+            yield self.rows_frame(columns, rows[start:start + chunk_rows])
+
+
+class TMSTableSnapshots:
+    """Parsed CSV files shared by every worker process through snapshot files under SNAPSHOT_DIR.
+
+    Every table file, terminal shard and month partition gets its own
+    snapshot, so loads keep partition pruning and an append only invalidates
+    the one file it touched. A snapshot directory is named after the size and
+    mtime of the file it was read from. The first load of a file after a
+    change has the snapshot published on a background thread of its own
+    (written to a temporary directory, then renamed), so it never waits
+    behind imports or exports on the job queue; loads read the CSV file
+    until it is there, then every process maps it. Older snapshots of the
+    file are removed. Snapshot files are only written and read by this
+    application.
+    """
+
+    def __init__(self, read_file, snapshot_dir=SNAPSHOT_DIR):
+        self.read_file = read_file
+        self.snapshot_dir = snapshot_dir
+        self.lock = threading.Lock()
+        self.pool = None
+        self.open_snapshots = {}
+        self.publishing = set()
+        self.failed = {}
+
+    def snapshot_path(self, path):
+        """Directory holding the snapshots of a data file"""
+        return os.path.join(self.snapshot_dir, os.path.relpath(path, DATA_DIR))
+
+    def snapshot_name(self, path):
+        """Name of the snapshot of a file's current contents, or None if the file is missing"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def get(self, path):
+        """Current snapshot of a CSV file, or None.
+
+        When the file changed since its last snapshot, publishing it is
+        queued and None is returned, so the caller reads the CSV file.
+        """
+        name = self.snapshot_name(path)
+        if name is None:
+            with self.lock:
+                self.open_snapshots.pop(path, None)
+            return None
+        with self.lock:
+            cached = self.open_snapshots.get(path)
+            if cached is not None and cached[0] == name:
+                return cached[1]
+
+        snapshot_path = os.path.join(self.snapshot_path(path), name)
+        if not os.path.isdir(snapshot_path):
+            with self.lock:
+                if path in self.publishing or self.failed.get(path) == name:
+                    return None
+                self.publishing.add(path)
+                if self.pool is None:
+                    self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tms-snapshot')
+                self.pool.submit(self.publish_file, path)
+            return None
+
+        try:
+            snapshot = TableSnapshot(snapshot_path)
+        except Exception as e:
+            print(f"Error mapping snapshot {snapshot_path}: {str(e)}")
+            # Published again by the next load
+            shutil.rmtree(snapshot_path, ignore_errors=True)
+            return None
+        with self.lock:
+            self.open_snapshots[path] = (name, snapshot)
+            # Files compacted away or removed by a rewrite, possibly in another process
+            for stale in [open_path for open_path in self.open_snapshots if not os.path.exists(open_path)]:
+                del self.open_snapshots[stale]
+        return snapshot
+
+    def publish_file(self, path):
+        """Parse a CSV file and publish its snapshot; returns the snapshot name (None if it failed)"""
+        try:
+            name = self.snapshot_name(path)
+            if name is None or os.path.isdir(os.path.join(self.snapshot_path(path), name)):
+                return name
+            df = self.read_file(path)
+            if len(df.columns) == 0:
+                # Not retried until the file changes
+                with self.lock:
+                    self.failed[path] = name
+                return None
+            self.publish(df, os.path.join(self.snapshot_path(path), name))
+            self.prune(path, name)
+            return name
+        except Exception as e:
+            print(f"Error publishing snapshot of {path}: {str(e)}")
+            return None
+        finally:
+            with self.lock:
+                self.publishing.discard(path)
+
+    def publish(self, df, path):
+        """Write a DataFrame as a snapshot directory"""
+        temp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+        os.makedirs(temp_path, exist_ok=True)
+
+        columns = []
+        for index, name in enumerate(df.columns):
+            series = df[name]
+            if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biuf':
+                np.save(os.path.join(temp_path, f"{index}.npy"), series.to_numpy())
+                encoding = 'values'
+            else:
+                codes, uniques = pd.factorize(series)
+                np.save(os.path.join(temp_path, f"{index}.npy"), codes.astype('int32'))
+                with open(os.path.join(temp_path, f"{index}.values.json"), 'w') as f:
+                    json.dump(list(uniques), f, default=json_default)
+                encoding = 'codes'
+            columns.append({'name': str(name), 'dtype': str(series.dtype), 'encoding': encoding})
+
+        with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+            json.dump({'rows': len(df), 'columns': columns, 'created_at': datetime.now().isoformat()}, f)
+
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            # Another process published the same snapshot first
+            shutil.rmtree(temp_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+    def prune(self, path, keep=None):
+        """Remove the older snapshots of a file (processes still mapping them keep their pages)"""
+        if keep is None:
+            with self.lock:
+                self.open_snapshots.pop(path, None)
+        snapshot_dir = self.snapshot_path(path)
+        if not os.path.isdir(snapshot_dir):
+            return
+        for name in os.listdir(snapshot_dir):
+            if name != keep and not name.startswith('.'):
+                shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+
 
 class TMSDataManager:
     def __init__(self):
-        self.ensure_files_exist()
+        self.snapshots = TMSTableSnapshots(self.read_file)
+        self.write_listeners = []
+        self.loader_pool = None
+        self.inflight = {}
+        self.inflight_lock = threading.RLock()
+        self.table_locks = {}
+        self.lock_files = {}
+        self.ready = False
+
+    def add_write_listener(self, callback):
+        """Register a callback(file_path) invoked after every successful save"""
+        self.write_listeners.append(callback)
+
+    def notify_write(self, file_path):
+        """Tell write listeners that a data file changed"""
+        for callback in self.write_listeners:
+            try:
+                callback(file_path)
+            except Exception as e:
+                print(f"Error in write listener for {file_path}: {str(e)}")
+
+    def ensure_ready(self):
+        """Load pandas and create the directories and table files on first use rather than at import"""
+        if self.ready:
+            return
+        with self.inflight_lock:
+            if not self.ready:
+                pd.DataFrame
+                os.makedirs(DATA_DIR, exist_ok=True)
+                os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+                self.ensure_files_exist()
+                self.ready = True
 
     def ensure_files_exist(self):
         """Create CSV files with headers if they don't exist"""
 
         # Drivers file
         if not os.path.exists(DRIVERS_FILE):
-            drivers_df = pd.DataFrame(columns=[
-                'driver_id', 'first_name', 'last_name', 'license_number',
-                'driver_type', 'hire_date', 'phone', 'email', 'address',
-                'cdl_expiry', 'medical_expiry', 'status', 'notes', 'created_at'
-            ])
+            drivers_df = pd.DataFrame(columns=DRIVER_COLUMNS)
             drivers_df.to_csv(DRIVERS_FILE, index=False)
 
         # Trucks file
         if not os.path.exists(TRUCKS_FILE):
-            trucks_df = pd.DataFrame(columns=[
-                'truck_id', 'truck_number', 'make', 'model', 'year', 'vin',
-                'engine_type', 'mileage', 'assigned_driver', 'status',
-                'purchase_date', 'last_pm_date', 'next_pm_due', 'notes', 'created_at'
-            ])
+            trucks_df = pd.DataFrame(columns=TRUCK_COLUMNS)
             trucks_df.to_csv(TRUCKS_FILE, index=False)
 
         # Trailers file
         if not os.path.exists(TRAILERS_FILE):
-            trailers_df = pd.DataFrame(columns=[
-                'trailer_id', 'trailer_number', 'type', 'year', 'make',
-                'capacity', 'assigned_truck', 'status', 'last_inspection',
-                'next_inspection_due', 'notes', 'created_at'
-            ])
+            trailers_df = pd.DataFrame(columns=TRAILER_COLUMNS)
             trailers_df.to_csv(TRAILERS_FILE, index=False)
 
         # Maintenance file
         if not os.path.exists(MAINTENANCE_FILE):
-            maintenance_df = pd.DataFrame(columns=[
-                'maintenance_id', 'truck_id', 'trailer_id', 'maintenance_type',
-                'date', 'mileage', 'description', 'parts_cost', 'labor_cost',
-                'total_cost', 'shop_name', 'shop_location', 'technician',
-                'status', 'notes', 'created_at'
-            ])
+            maintenance_df = pd.DataFrame(columns=MAINTENANCE_COLUMNS)
             maintenance_df.to_csv(MAINTENANCE_FILE, index=False)
 
         # OTR Repairs file
         if not os.path.exists(OTR_FILE):
-            otr_df = pd.DataFrame(columns=[
-                'otr_id', 'truck_id', 'driver_id', 'breakdown_date', 'location',
-                'issue_description', 'repair_shop', 'repair_cost', 'parts_used',
-                'labor_hours', 'downtime_hours', 'tow_cost', 'hotel_cost',
-                'total_cost', 'insurance_claim', 'status', 'notes', 'created_at'
-            ])
+            otr_df = pd.DataFrame(columns=OTR_COLUMNS)
             otr_df.to_csv(OTR_FILE, index=False)
 
         # PM Records file
         if not os.path.exists(PM_FILE):
-            pm_df = pd.DataFrame(columns=[
-                'pm_id', 'truck_id', 'pm_type', 'date', 'mileage', 'next_due_date',
-                'next_due_mileage', 'shop_name', 'technician', 'oil_change',
-                'filter_change', 'inspection_items', 'parts_cost', 'labor_cost',
-                'total_cost', 'status', 'notes', 'created_at'
-            ])
+            pm_df = pd.DataFrame(columns=PM_COLUMNS)
             pm_df.to_csv(PM_FILE, index=False)
 
         # Shop Jobs file
         if not os.path.exists(SHOP_JOBS_FILE):
-            shop_jobs_df = pd.DataFrame(columns=[
-                'job_id', 'truck_id', 'trailer_id', 'job_type', 'date_started',
-                'date_completed', 'description', 'technician', 'parts_used',
-                'labor_hours', 'parts_cost', 'labor_cost', 'total_cost',
-                'status', 'priority', 'notes', 'created_at'
-            ])
+            shop_jobs_df = pd.DataFrame(columns=SHOP_JOB_COLUMNS)
             shop_jobs_df.to_csv(SHOP_JOBS_FILE, index=False)
 
-    def load_data(self, file_path):
-        """Load data from CSV file"""
+    def terminals(self):
+        """Names of the terminal shards under TERMINALS_DIR"""
+        if not os.path.isdir(TERMINALS_DIR):
+            return []
+        return sorted(name for name in os.listdir(TERMINALS_DIR)
+                      if os.path.isdir(os.path.join(TERMINALS_DIR, name)))
+
+    def create_terminal(self, terminal):
+        """Create an empty shard (header-only CSVs) for a new terminal"""
+        self.ensure_ready()
+        os.makedirs(os.path.join(TERMINALS_DIR, terminal), exist_ok=True)
+        for file_path in TABLE_FILES.values():
+            shard_file = self.shard_file(file_path, terminal)
+            if not os.path.exists(shard_file):
+                pd.read_csv(file_path, nrows=0).to_csv(shard_file, index=False)
+
+    def shard_file(self, file_path, terminal):
+        return os.path.join(TERMINALS_DIR, terminal, os.path.basename(file_path))
+
+    def shard_paths(self, file_path):
+        """(terminal, path) pairs of the files backing a table in the current scope.
+
+        A terminal-scoped request reads only its shard; a company-wide request
+        reads the unsharded file plus every terminal shard.
+        """
+        self.ensure_ready()
+        terminal = current_terminal.get()
+        if terminal:
+            return [(terminal, self.shard_file(file_path, terminal))]
+
+        shards = [(None, file_path)]
+        for name in self.terminals():
+            shard_file = self.shard_file(file_path, name)
+            if os.path.exists(shard_file):
+                shards.append((name, shard_file))
+        return shards
+
+    def partition_dir(self, scope_path):
+        """Directory holding the month partitions of a table file"""
+        return os.path.splitext(scope_path)[0]
+
+    def partition_file(self, scope_path, start_month, end_month):
+        return os.path.join(self.partition_dir(scope_path), f"{start_month}_{end_month}.csv")
+
+    def partitions(self, scope_path):
+        """(start_month, end_month, path) of every partition of a table file, oldest first"""
+        directory = self.partition_dir(scope_path)
+        if not os.path.isdir(directory):
+            return []
+
+        found = []
+        for name in os.listdir(directory):
+            match = PARTITION_NAME.match(name)
+            if match:
+                found.append((match.group(1), match.group(2), os.path.join(directory, name)))
+        return sorted(found)
+
+    def row_months(self, df, date_column):
+        """YYYY-MM of each row's partition date ('' when missing or malformed)"""
+        values = df[date_column].astype(str)
+        return values.str[:7].where(values.str.match(r'^\d{4}-\d{2}'), '')
+
+    def table_files(self, file_path, date_from=None, date_to=None):
+        """(terminal, path) of every file to read for a table in the current scope.
+
+        For partitioned history tables only the month partitions overlapping
+        [date_from, date_to] are returned (partition pruning); the table file
+        itself always is, as it keeps the rows without a usable date.
+        """
+        files = []
+        for terminal, scope_path in self.shard_paths(file_path):
+            files.append((terminal, scope_path))
+            if file_path not in PARTITION_DATE_COLUMNS:
+                continue
+            for start_month, end_month, path in self.partitions(scope_path):
+                if date_to and start_month > date_to[:7]:
+                    continue
+                if date_from and end_month < date_from[:7]:
+                    continue
+                files.append((terminal, path))
+        return files
+
+    def filter_date_range(self, df, file_path, date_from=None, date_to=None):
+        """Keep the rows of a history table whose partition date is in range"""
+        date_column = PARTITION_DATE_COLUMNS.get(file_path)
+        if date_column is None or not (date_from or date_to) or date_column not in df.columns:
+            return df
+
+        dates = df[date_column].astype(str).str[:10]
+        mask = dates.str.match(r'^\d{4}-\d{2}-\d{2}$')
+        if date_from:
+            mask &= dates >= date_from
+        if date_to:
+            mask &= dates <= date_to
+        return df[mask]
+
+    def cache_key(self, file_path, date_from=None, date_to=None):
+        """Key of a loaded table in prefetched_tables"""
+        if file_path not in PARTITION_DATE_COLUMNS:
+            date_from = date_to = None
+        return current_terminal.get(), file_path, date_from, date_to
+
+    def combine_shards(self, shard_frames):
+        """Concatenate shard DataFrames, tagging rows with their terminal"""
+        if len(shard_frames) == 1 and shard_frames[0][0] is None:
+            return shard_frames[0][1]
+
+        frames = [df if terminal is None else df.assign(**{TERMINAL_COLUMN: terminal})
+                  for terminal, df in shard_frames]
+        return pd.concat(frames, ignore_index=True)
+
+    def apply_where(self, df, where):
+        """Keep rows matching {column: value or [values]}"""
+        for column, value in (where or {}).items():
+            if column not in df.columns:
+                return df.iloc[0:0]
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            df = df[df[column].isin(values)]
+        return df
+
+    def project(self, df, columns):
+        """Keep only the requested columns (plus the terminal tag, if any)"""
+        if columns is None:
+            return df
+        keep = [column for column in columns if column in df.columns]
+        if TERMINAL_COLUMN in df.columns and TERMINAL_COLUMN not in keep:
+            keep.append(TERMINAL_COLUMN)
+        return df[keep]
+
+    def read_columns(self, file_path, columns, where, date_from=None, date_to=None):
+        """Columns to parse: the projection plus those the filters need"""
+        if columns is None:
+            return None
+        needed = list(columns) + list(where or {})
+        date_column = PARTITION_DATE_COLUMNS.get(file_path)
+        if date_column and (date_from or date_to):
+            needed.append(date_column)
+        return list(dict.fromkeys(needed))
+
+    def read_file(self, file_path, columns=None, where=None):
+        """Load data from a single CSV file, parsing only the given columns and matching rows"""
         try:
-            return pd.read_csv(file_path)
+            usecols = None
+            if columns is not None:
+                wanted = set(columns) | set(where or {})
+                usecols = lambda name: name in wanted
+
+            if not where:
+                return pd.read_csv(file_path, usecols=usecols)
+
+            chunks = [self.apply_where(chunk, where)
+                      for chunk in pd.read_csv(file_path, usecols=usecols, chunksize=CSV_CHUNK_ROWS)]
+            if not chunks:
+                return pd.read_csv(file_path, usecols=usecols, nrows=0)
+            return self.project(pd.concat(chunks, ignore_index=True), columns)
         except Exception as e:
             print(f"Error loading data from {file_path}: {str(e)}")
             return pd.DataFrame()
 
+    def load_data(self, file_path, date_from=None, date_to=None, columns=None, where=None):
+        """Load data from CSV file.
+
+        columns limits parsing to those columns, where ({column: value or
+        [values]}) is applied while the file is read, and history tables can
+        be bounded to a date range.
+        """
+        prefetched = prefetched_tables.get()
+        key = self.cache_key(file_path, date_from, date_to)
+        if prefetched is not None and key in prefetched:
+            return self.project(self.apply_where(prefetched[key], where), columns).copy()
+
+        return self.finish_file_loads(file_path, self.start_file_loads(file_path, date_from, date_to, columns, where),
+                                      date_from, date_to, columns)
+
+    def start_file_loads(self, file_path, date_from=None, date_to=None, columns=None, where=None):
+        """Start reading every file of a table in the current scope: (terminal, DataFrame or Future) pairs.
+
+        Files with a published snapshot (see TMSTableSnapshots) are sliced
+        right away. The others are parsed in parallel on the loader pool,
+        concurrent identical reads sharing one in-flight load.
+        """
+        read_columns = self.read_columns(file_path, columns, where, date_from, date_to)
+        loads = []
+        for terminal, path in self.table_files(file_path, date_from, date_to):
+            snapshot = self.snapshots.get(path) if TABLE_SNAPSHOTS else None
+            if snapshot is not None:
+                loads.append((terminal, snapshot.frame(read_columns, where)))
+            else:
+                loads.append((terminal, self.load_data_shared(path, read_columns, where)))
+        return loads
+
+    def finish_file_loads(self, file_path, loads, date_from=None, date_to=None, columns=None):
+        """Wait for start_file_loads and combine the files into the table's DataFrame"""
+        df = self.combine_shards([(terminal, load.result() if isinstance(load, Future) else load)
+                                  for terminal, load in loads])
+        return self.project(self.filter_date_range(df, file_path, date_from, date_to), columns)
+
+    def get_loader_pool(self):
+        """Lazily create the bounded table loading thread pool"""
+        with self.inflight_lock:
+            if self.loader_pool is None:
+                self.loader_pool = ThreadPoolExecutor(max_workers=TABLE_LOAD_WORKERS,
+                                                      thread_name_prefix='tms-load')
+            return self.loader_pool
+
+    def load_data_shared(self, file_path, columns=None, where=None):
+        """Read a CSV file on the loader pool; concurrent identical reads share one in-flight load"""
+        frozen_where = tuple(sorted(
+            (column, tuple(value) if isinstance(value, (list, tuple, set)) else value)
+            for column, value in (where or {}).items()
+        ))
+        key = (file_path, tuple(columns) if columns is not None else None, frozen_where)
+        with self.inflight_lock:
+            future = self.inflight.get(key)
+            if future is None:
+                future = self.get_loader_pool().submit(self.read_file, file_path, columns, where)
+                self.inflight[key] = future
+                future.add_done_callback(lambda done: self.finish_shared_load(key, done))
+            return future
+
+    def finish_shared_load(self, key, future):
+        with self.inflight_lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+    def load_many(self, file_paths, date_from=None, date_to=None, columns=None, where=None):
+        """Load several tables concurrently; returns DataFrames in the same order.
+
+        Every shard and partition of every requested table is read in
+        parallel, so a company-wide load fans out across all terminals at
+        once. The date range only applies to partitioned history tables;
+        columns and where map a file path to that table's projection/filter.
+        """
+        columns = columns or {}
+        where = where or {}
+        prefetched = prefetched_tables.get() or {}
+        plans = []
+        for file_path in file_paths:
+            key = self.cache_key(file_path, date_from, date_to)
+            if key in prefetched:
+                plans.append(self.project(self.apply_where(prefetched[key], where.get(file_path)),
+                                          columns.get(file_path)).copy())
+            else:
+                plans.append(self.start_file_loads(file_path, date_from, date_to, columns.get(file_path),
+                                                   where.get(file_path)))
+
+        frames = []
+        for file_path, plan in zip(file_paths, plans):
+            if isinstance(plan, pd.DataFrame):
+                frames.append(self.project(plan, columns.get(file_path)))
+            else:
+                frames.append(self.finish_file_loads(file_path, plan, date_from, date_to, columns.get(file_path)))
+        return frames
+
+    async def load_data_async(self, file_path, date_from=None, date_to=None, columns=None, where=None):
+        """Non-blocking load_data for async callers"""
+        loads = self.start_file_loads(file_path, date_from, date_to, columns, where)
+        await asyncio.gather(*(asyncio.wrap_future(load) for _, load in loads if isinstance(load, Future)))
+        return self.finish_file_loads(file_path, loads, date_from, date_to, columns)
+
+    def read_chunks(self, path, columns=None, chunk_rows=CSV_CHUNK_ROWS):
+        """Yield a CSV file (only the given columns) as DataFrames of at most chunk_rows rows"""
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda name: name in wanted
+
+        try:
+            reader = pd.read_csv(path, usecols=usecols, chunksize=chunk_rows)
+        except Exception as e:
+            print(f"Error loading data from {path}: {str(e)}")
+            return
+        with reader:
+            yield from reader
+
+    def iter_chunks(self, file_path, date_from=None, date_to=None, columns=None, where=None,
+                    chunk_rows=CSV_CHUNK_ROWS):
+        """Yield a table in the current scope as DataFrames of at most chunk_rows rows.
+
+        Each shard and partition is sliced from its published snapshot, or
+        else parsed chunk by chunk, so memory stays bounded however large
+        the table is. Filters and projection are the same as load_data.
+        """
+        prefetched = prefetched_tables.get()
+        key = self.cache_key(file_path, date_from, date_to)
+        if prefetched is not None and key in prefetched:
+            df = self.project(self.apply_where(prefetched[key], where), columns)
+            for start in range(0, len(df), chunk_rows):
+                yield df.iloc[start:start + chunk_rows]
+            return
+
+        read_columns = self.read_columns(file_path, columns, where, date_from, date_to)
+        for terminal, path in self.table_files(file_path, date_from, date_to):
+            snapshot = self.snapshots.get(path) if TABLE_SNAPSHOTS else None
+            if snapshot is not None:
+                chunks = snapshot.chunks(read_columns, where, chunk_rows)
+            else:
+                chunks = (self.apply_where(chunk, where) for chunk in self.read_chunks(path, read_columns, chunk_rows))
+
+            for chunk in chunks:
+                chunk = self.filter_date_range(chunk, file_path, date_from, date_to)
+                if chunk.empty:
+                    continue
+                if terminal is not None:
+                    chunk = chunk.assign(**{TERMINAL_COLUMN: terminal})
+                yield self.project(chunk, columns)
+
+    def iter_rows(self, file_path, record_cls, date_from=None, date_to=None, columns=None, where=None):
+        """Yield the rows of a table as record_cls records, building them one chunk at a time (see iter_chunks)"""
+        for chunk in self.iter_chunks(file_path, date_from, date_to, columns, where):
+            yield from record_cls.from_frame(chunk)
+
+    @contextmanager
+    def table_lock(self, file_path):
+        """Hold a table's write lock.
+
+        append_record, write_data and compact_partitions take it, so a row
+        appended while a file is being rewritten is never lost. It is
+        re-entrant within a thread and, where fcntl is available, also
+        excludes the other worker processes.
+        """
+        with self.inflight_lock:
+            lock = self.table_locks.setdefault(file_path, threading.RLock())
+        with lock:
+            if self.lock_files.get(file_path) is not None:
+                yield
+                return
+            os.makedirs(LOCK_DIR, exist_ok=True)
+            with open(os.path.join(LOCK_DIR, f"{TABLE_NAMES[file_path]}.lock"), 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self.lock_files[file_path] = lock_file
+                try:
+                    yield
+                finally:
+                    self.lock_files[file_path] = None
+
+    def write_csv(self, df, path):
+        """Write a CSV file through a temporary file, so readers see either the old or the new file"""
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            df.to_csv(temp_path, index=False)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def month_partition(self, scope_path, month, partitions):
+        """The partition covering a month, or a new one-month partition"""
+        for start_month, end_month, path in partitions:
+            if start_month <= month <= end_month:
+                return path
+        return self.partition_file(scope_path, month, month)
+
+    def write_data(self, df, file_path):
+        """Write a table in the current scope, routing rows to terminal shards.
+
+        Company-wide frames carrying a terminal column are split back into
+        their shards; rows without a terminal go to the unsharded file.
+        Raises on failure.
+        """
+        with self.table_lock(file_path):
+            terminal = current_terminal.get()
+            if terminal:
+                self.write_scope(df.drop(columns=[TERMINAL_COLUMN], errors='ignore'), file_path,
+                                 self.shard_file(file_path, terminal))
+                return
+
+            if TERMINAL_COLUMN not in df.columns:
+                self.write_scope(df, file_path, file_path)
+                return
+
+            terminal_values = df[TERMINAL_COLUMN].fillna('').astype(str)
+            self.write_scope(df[terminal_values == ''].drop(columns=[TERMINAL_COLUMN]), file_path, file_path)
+
+            written = set()
+            sharded = terminal_values != ''
+            for name, shard_df in df[sharded].groupby(terminal_values[sharded]):
+                name = secure_filename(name)
+                os.makedirs(os.path.join(TERMINALS_DIR, name), exist_ok=True)
+                self.write_scope(shard_df.drop(columns=[TERMINAL_COLUMN]), file_path,
+                                 self.shard_file(file_path, name))
+                written.add(name)
+
+            # Shards with no rows left in the frame are emptied
+            for name in self.terminals():
+                shard_file = self.shard_file(file_path, name)
+                if name not in written and os.path.exists(shard_file):
+                    self.write_scope(df.iloc[0:0].drop(columns=[TERMINAL_COLUMN]), file_path, shard_file)
+
+    def write_scope(self, df, file_path, scope_path):
+        """Write one scope's rows, spreading them over month partitions if partitioned.
+
+        Existing partitions keep their month ranges and are replaced file by
+        file; partitions left without rows are removed last.
+        """
+        self.ensure_ready()
+        date_column = PARTITION_DATE_COLUMNS.get(file_path)
+        if date_column is None or not os.path.isdir(self.partition_dir(scope_path)):
+            self.write_csv(df, scope_path)
+            return
+
+        partitions = self.partitions(scope_path)
+        months = self.row_months(df, date_column)
+        dated = months != ''
+        targets = months[dated].map({month: self.month_partition(scope_path, month, partitions)
+                                     for month in months[dated].unique()})
+        written = set()
+        for path, partition_df in df[dated].groupby(targets):
+            self.write_csv(partition_df, path)
+            written.add(path)
+        self.write_csv(df[~dated], scope_path)
+
+        for _, _, path in partitions:
+            if path not in written:
+                os.remove(path)
+                self.snapshots.prune(path)
+
     def save_data(self, df, file_path):
         """Save data to CSV file"""
         try:
-            df.to_csv(file_path, index=False)
-            return True
+            self.write_data(df, file_path)
         except Exception as e:
             print(f"Error saving data to {file_path}: {str(e)}")
             return False
 
+        self.notify_write(file_path)
+        return True
+
+    def append_record(self, file_path, record):
+        """Append one record in the current scope without rewriting the table.
+
+        History records go to the month partition covering their date when
+        the table is partitioned.
+        """
+        self.ensure_ready()
+        terminal = current_terminal.get()
+        scope_path = self.shard_file(file_path, terminal) if terminal else file_path
+        target = scope_path
+
+        try:
+            with self.table_lock(file_path):
+                date_column = PARTITION_DATE_COLUMNS.get(file_path)
+                month = str(record.get(date_column, ''))[:7] if date_column else ''
+                if re.match(r'^\d{4}-\d{2}$', month) and os.path.isdir(self.partition_dir(scope_path)):
+                    target = self.month_partition(scope_path, month, self.partitions(scope_path))
+
+                if os.path.exists(target):
+                    columns = list(pd.read_csv(target, nrows=0).columns)
+                else:
+                    columns = list(pd.read_csv(scope_path, nrows=0).columns)
+
+                if os.path.exists(target) and not set(record) - set(columns):
+                    pd.DataFrame([record]).reindex(columns=columns).to_csv(target, mode='a', header=False,
+                                                                           index=False)
+                else:
+                    existing = pd.read_csv(target) if os.path.exists(target) else pd.DataFrame(columns=columns)
+                    self.write_csv(pd.concat([existing, pd.DataFrame([record])], ignore_index=True), target)
+        except Exception as e:
+            print(f"Error appending data to {target}: {str(e)}")
+            return False
+
+        self.notify_write(file_path)
+        return True
+
+    def compact_partitions(self, file_path):
+        """Partition and compact a history table in every scope.
+
+        Dated rows still in the table file are moved into month partitions,
+        then runs of adjacent small partitions are merged until they reach
+        PARTITION_TARGET_ROWS. Returns the number of partitions per scope.
+        """
+        date_column = PARTITION_DATE_COLUMNS[file_path]
+        token = current_terminal.set(None)
+        try:
+            scopes = self.shard_paths(file_path)
+        finally:
+            current_terminal.reset(token)
+
+        summary = {}
+        for terminal, scope_path in scopes:
+            # Files are read and replaced under the table's write lock; a
+            # failed read raises instead of writing back an empty file
+            with self.table_lock(file_path):
+                summary[terminal or 'company'] = self.compact_scope(scope_path, date_column)
+
+        self.notify_write(file_path)
+        return summary
+
+    def compact_scope(self, scope_path, date_column):
+        """compact_partitions for one table file; returns its number of partitions"""
+        os.makedirs(self.partition_dir(scope_path), exist_ok=True)
+
+        base_df = pd.read_csv(scope_path)
+        if date_column in base_df.columns:
+            partitions = self.partitions(scope_path)
+            months = self.row_months(base_df, date_column)
+            for month, month_df in base_df[months != ''].groupby(months[months != '']):
+                partition = self.month_partition(scope_path, month, partitions)
+                if os.path.exists(partition):
+                    month_df = pd.concat([pd.read_csv(partition), month_df], ignore_index=True)
+                self.write_csv(month_df, partition)
+            self.write_csv(base_df[months == ''], scope_path)
+
+        groups = []
+        for start_month, end_month, path in self.partitions(scope_path):
+            rows = len(pd.read_csv(path))
+            if groups and groups[-1]['rows'] + rows <= PARTITION_TARGET_ROWS:
+                groups[-1]['paths'].append(path)
+                groups[-1]['end'] = end_month
+                groups[-1]['rows'] += rows
+            else:
+                groups.append({'start': start_month, 'end': end_month, 'rows': rows, 'paths': [path]})
+
+        for group in groups:
+            if len(group['paths']) < 2:
+                continue
+            merged = pd.concat([pd.read_csv(path) for path in group['paths']], ignore_index=True)
+            self.write_csv(merged, self.partition_file(scope_path, group['start'], group['end']))
+            for path in group['paths']:
+                os.remove(path)
+                self.snapshots.prune(path)
+
+        return len(groups)
+
     def generate_id(self):
         """Generate unique ID"""
         return str(uuid.uuid4())[:8]
 
 
+class TMSChangeLog:
+    """Per-table version counters backed by an append-only JSONL change log.
+
+    Every insert made by an add_* route and every table replaced by /import
+    bumps that table's version and appends one line to CHANGE_LOG_FILE.
+    Changes made in a terminal scope record that terminal. Where fcntl is
+    available a lock file next to the log is held while a version is
+    assigned, so worker processes never hand out the same version twice.
+
+    A full log is archived and a new one started with a checkpoint line
+    holding every table's version. Readers keep a position (the log's first
+    line and a byte offset) and only read what was appended after it.
+    """
+
+    def __init__(self, log_file=CHANGE_LOG_FILE, archive_dir=CHANGE_LOG_ARCHIVE_DIR):
+        self.log_file = log_file
+        self.archive_dir = archive_dir
+        self.lock = threading.Lock()
+        self.table_versions = None
+        self.log_position = None
+
+    def read_log(self, path, position=None):
+        """Changes in a log file after position (from an earlier read).
+
+        Returns (changes, position after the last complete line). A position
+        in a log that has since been archived reads the new log from the start.
+        """
+        try:
+            with open(path, 'rb') as f:
+                first_line = f.readline()
+                offset = position[1] if position is not None and position[0] == first_line else 0
+                f.seek(offset)
+                appended = f.read()
+        except OSError:
+            return [], position
+        # A line another process is still writing is read on the next call
+        complete = appended.rfind(b'\n') + 1
+        changes = [json.loads(line) for line in appended[:complete].splitlines() if line.strip()]
+        return changes, (first_line if first_line.endswith(b'\n') else b'', offset + complete)
+
+    def archived_logs(self):
+        """Archived log files, oldest first"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return [os.path.join(self.archive_dir, name) for name in sorted(os.listdir(self.archive_dir))
+                if name.endswith('.jsonl')]
+
+    def load_versions(self):
+        """Bring the version counters up to date with the log.
+
+        Only the lines appended since the last call are read, so changes
+        made by other worker processes are picked up cheaply.
+        """
+        if self.table_versions is None:
+            self.table_versions = {table: 0 for table in TABLE_FILES}
+        changes, self.log_position = self.read_log(self.log_file, self.log_position)
+        for change in changes:
+            versions = change['versions'] if change['op'] == 'checkpoint' else {change['table']: change['version']}
+            for table, version in versions.items():
+                self.table_versions[table] = max(self.table_versions.get(table, 0), version)
+
+    def version(self, table):
+        """Current version of a table (0 if it never changed)"""
+        with self.lock:
+            self.load_versions()
+            return self.table_versions.get(table, 0)
+
+    def version_position(self, table):
+        """Current version of a table and the log position to pass to changes_since later"""
+        with self.lock:
+            self.load_versions()
+            return self.table_versions.get(table, 0), self.log_position
+
+    def versions(self):
+        with self.lock:
+            self.load_versions()
+            return dict(self.table_versions)
+
+    def record(self, table, op, record=None, rows=None):
+        """Append a change ('insert', 'replace' or 'merge') and return the new table version"""
+        with self.lock, open(self.log_file + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                # Released when the lock file is closed
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self.load_versions()
+            version = self.table_versions.get(table, 0) + 1
+            change = {
+                'table': table,
+                'version': version,
+                'op': op,
+                'timestamp': datetime.now().isoformat(),
+            }
+            if current_terminal.get():
+                change['terminal'] = current_terminal.get()
+            if record is not None:
+                change['record'] = record
+            if rows is not None:
+                change['rows'] = rows
+
+            with open(self.log_file, 'a') as f:
+                f.write(json.dumps(change, default=str) + '\n')
+                full = f.tell() >= CHANGE_LOG_MAX_BYTES
+            self.table_versions[table] = version
+            if full:
+                self.rotate()
+            return version
+
+    def rotate(self):
+        """Archive the log and start a new one from a checkpoint (called holding the lock)"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        checkpoint = {'op': 'checkpoint', 'versions': dict(self.table_versions),
+                      'timestamp': datetime.now().isoformat()}
+        temp_file = self.log_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            f.write(json.dumps(checkpoint) + '\n')
+        os.replace(self.log_file, os.path.join(self.archive_dir, f"changes_{datetime.now():%Y%m%d_%H%M%S_%f}.jsonl"))
+        os.replace(temp_file, self.log_file)
+
+        for path in self.archived_logs()[:-CHANGE_LOG_RETENTION]:
+            os.remove(path)
+
+    def logs_newest_first(self):
+        """Yield the changes of the current log, then of each archived log going back in time"""
+        yield self.read_log(self.log_file)[0]
+        for path in reversed(self.archived_logs()):
+            yield self.read_log(path)[0]
+
+    def versions_at(self, timestamp):
+        """Every table's version at an ISO timestamp, or None if the logs going back that far were removed"""
+        for changes in self.logs_newest_first():
+            if changes and changes[0]['op'] == 'checkpoint' and changes[0]['timestamp'] > timestamp:
+                continue
+            versions = {table: 0 for table in TABLE_FILES}
+            for change in changes:
+                if change['timestamp'] > timestamp:
+                    break
+                found = change['versions'] if change['op'] == 'checkpoint' else {change['table']: change['version']}
+                for table, version in found.items():
+                    versions[table] = max(versions.get(table, 0), version)
+            return versions
+        return None
+
+    def changes_since(self, table, version, position=None):
+        """Changes to a table with a version greater than the given one.
+
+        With a position from version_position() or an earlier call, only the
+        log appended since is read. Returns (changes, position); changes is
+        None if the logs going back that far were removed.
+        """
+        changes, position = self.read_log(self.log_file, position)
+        found = [change for change in changes if change.get('table') == table and change['version'] > version]
+        if not changes or changes[0]['op'] != 'checkpoint' or changes[0]['versions'].get(table, 0) <= version:
+            return found, position
+
+        # The log started after that version: look back through the archived logs
+        for path in reversed(self.archived_logs()):
+            changes = self.read_log(path)[0]
+            found = [change for change in changes
+                     if change.get('table') == table and change['version'] > version] + found
+            if not changes or changes[0]['op'] != 'checkpoint' or changes[0]['versions'].get(table, 0) <= version:
+                return found, position
+        return None, position
+
+
+class TMSJobQueue:
+    """In-process background jobs, with each job's status persisted under JOBS_DIR.
+
+    A job runs on the worker pool in the context (terminal scope) of the
+    request that submitted it. Its status file is rewritten on every
+    progress report, so any worker process can answer /jobs/<id>.
+    """
+
+    def __init__(self, jobs_dir=JOBS_DIR, workers=JOB_WORKERS):
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.pool = None
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def status_file(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def update(self, job_id, **fields):
+        """Merge fields into a job's status and write it to disk atomically"""
+        with self.lock:
+            job = self.jobs.setdefault(job_id, {'id': job_id})
+            job.update(fields)
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            temp_file = self.status_file(job_id) + '.tmp'
+            with open(temp_file, 'w') as f:
+                json.dump(job, f, default=str)
+            os.replace(temp_file, self.status_file(job_id))
+            if job.get('status') in ('finished', 'failed'):
+                del self.jobs[job_id]
+
+    def submit(self, kind, func, *args):
+        """Queue func(report, *args) and return the job ID.
+
+        report(progress, message) records the job's progress (0-100); the
+        function's return value is stored as the job result.
+        """
+        job_id = uuid.uuid4().hex
+        self.update(job_id, kind=kind, status='queued', progress=0, message='Queued',
+                    created_at=datetime.now().isoformat())
+
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tms-job')
+            self.pool.submit(copy_context().run, self.run, job_id, func, args)
+
+        self.prune()
+        return job_id
+
+    def run(self, job_id, func, args):
+        def report(progress, message):
+            self.update(job_id, progress=progress, message=message)
+
+        self.update(job_id, status='running', message='Running', started_at=datetime.now().isoformat())
+        try:
+            result = func(report, *args)
+        except Exception as e:
+            print(f"Error in background job {job_id}: {str(e)}")
+            self.update(job_id, status='failed', message=str(e), finished_at=datetime.now().isoformat())
+            return
+        self.update(job_id, status='finished', progress=100, message='Done', result=result,
+                    finished_at=datetime.now().isoformat())
+
+    def status(self, job_id):
+        """Persisted status of a job, or None if unknown"""
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+            return None
+        try:
+            with open(self.status_file(job_id), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def prune(self):
+        """Keep only the newest JOB_RETENTION_COUNT status files (and those of jobs still running here)"""
+        with self.lock:
+            unfinished = {self.status_file(job_id) for job_id in self.jobs}
+        status_files = sorted(
+            (os.path.join(self.jobs_dir, name) for name in os.listdir(self.jobs_dir) if name.endswith('.json')),
+            key=os.path.getmtime, reverse=True
+        )
+        for old_file in status_files[JOB_RETENTION_COUNT:]:
+            if old_file in unfinished:
+                continue
+            try:
+                os.remove(old_file)
+            except OSError as e:
+                print(f"Error removing old job status {old_file}: {str(e)}")
+
+
+class IntervalTree:
+    """Static centered interval tree over inclusive (start, end, item) intervals"""
+
+    def __init__(self, intervals):
+        self.size = len(intervals)
+        self.root = self.build(sorted(intervals, key=lambda interval: interval[0]))
+
+    def build(self, intervals):
+        """Node (center, by_start, by_end, left, right) over intervals sorted by start"""
+        if not intervals:
+            return None
+        # The median start keeps both subtrees at most half the size; the
+        # partitions below preserve the start order, so nothing is re-sorted
+        center = intervals[len(intervals) // 2][0]
+
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        return center, here, by_end, self.build(left), self.build(right)
+
+    def overlap(self, start, end):
+        """Items of the intervals overlapping [start, end]"""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            center, by_start, by_end, left, right = node
+            if end < center:
+                for interval in by_start:
+                    if interval[0] > end:
+                        break
+                    found.append(interval[2])
+                stack.append(left)
+            elif start > center:
+                for interval in by_end:
+                    if interval[1] < start:
+                        break
+                    found.append(interval[2])
+                stack.append(right)
+            else:
+                found.extend(interval[2] for interval in by_start)
+                stack.append(left)
+                stack.append(right)
+        return found
+
+
+class ShopSchedule:
+    """Technician workload over the shop jobs, for availability and utilization queries.
+
+    Each job occupies its technician from date_started to date_completed.
+    Open jobs without a completion date run for their labor hours at
+    TECHNICIAN_HOURS_PER_DAY, and at least through today. Dates are day
+    ordinals and intervals are inclusive.
+    """
+
+    def __init__(self, jobs_df):
+        jobs = self.job_intervals(jobs_df)
+        self.technicians = sorted(jobs['technician'].unique())
+        self.trees = {}
+        for technician, technician_jobs in jobs.groupby('technician'):
+            # Each interval's item is (job_id, labor_hours, start, end)
+            starts = technician_jobs['start'].tolist()
+            ends = technician_jobs['end'].tolist()
+            items = zip(technician_jobs['job_id'].tolist(), technician_jobs['labor_hours'].tolist(), starts, ends)
+            self.trees[technician] = IntervalTree(list(zip(starts, ends, items)))
+
+        open_jobs = jobs[~jobs['status'].isin(CLOSED_JOB_STATUSES)]
+        by_priority = open_jobs.groupby('priority')['labor_hours'].agg(['count', 'sum'])
+        priorities = SHOP_PRIORITIES + sorted(set(by_priority.index) - set(SHOP_PRIORITIES))
+        self.backlog = [
+            {'priority': priority,
+             'jobs': int(by_priority['count'].get(priority, 0)),
+             'labor_hours': float(by_priority['sum'].get(priority, 0.0))}
+            for priority in priorities
+        ]
+
+    @staticmethod
+    def job_intervals(jobs_df):
+        """Jobs with a technician and a valid start date, with start/end day ordinals"""
+        df = jobs_df.reindex(columns=SCHEDULE_COLUMNS)
+        technicians = df['technician'].fillna('').astype(str).str.strip()
+        started = pd.to_datetime(df['date_started'], errors='coerce')
+        valid = (technicians != '') & started.notna()
+        df = df[valid].assign(technician=technicians[valid])
+        started = started[valid]
+        completed = pd.to_datetime(df['date_completed'], errors='coerce')
+
+        epoch = date(1970, 1, 1).toordinal()
+        start = started.values.astype('datetime64[D]').astype('int64') + epoch
+        hours = pd.to_numeric(df['labor_hours'], errors='coerce').fillna(0.0).clip(lower=0.0)
+        estimated_days = (hours // TECHNICIAN_HOURS_PER_DAY + (hours % TECHNICIAN_HOURS_PER_DAY > 0)).clip(lower=1)
+        end = start + estimated_days.astype('int64').values - 1
+
+        done = completed.notna().values
+        completed_end = completed.values.astype('datetime64[D]').astype('int64') + epoch
+        end[done] = completed_end[done]
+
+        is_open = ~df['status'].isin(CLOSED_JOB_STATUSES).values & ~done
+        end[is_open] = end[is_open].clip(min=date.today().toordinal())
+
+        return df.assign(labor_hours=hours, start=start, end=end.clip(min=start),
+                         priority=df['priority'].fillna('Unspecified'), status=df['status'].fillna(''))
+
+    def jobs_between(self, technician, start, end):
+        tree = self.trees.get(technician)
+        return tree.overlap(start, end) if tree else []
+
+    def free_technicians(self, date_from, date_to):
+        """Technicians with no job between two dates, and the jobs keeping the others busy"""
+        start, end = date_from.toordinal(), date_to.toordinal()
+        free, busy = [], {}
+        for technician in self.technicians:
+            jobs = self.jobs_between(technician, start, end)
+            if jobs:
+                busy[technician] = sorted(str(job[0]) for job in jobs)
+            else:
+                free.append(technician)
+        return {'from': date_from.isoformat(), 'to': date_to.isoformat(), 'free': free, 'busy': busy}
+
+    def booked_hours(self, technician, start, end):
+        """Labor hours booked between two day ordinals, spreading each job evenly over its days"""
+        hours = 0.0
+        for _, labor_hours, job_start, job_end in self.jobs_between(technician, start, end):
+            overlap = min(end, job_end) - max(start, job_start) + 1
+            hours += labor_hours * overlap / (job_end - job_start + 1)
+        return hours
+
+    def utilization(self, date_from, date_to, technicians=None):
+        """Booked hours and utilization per technician for each week (Monday to Sunday) in range"""
+        technicians = technicians or self.technicians
+        week_start = date_from - timedelta(days=date_from.weekday())
+        weeks = []
+        while week_start <= date_to:
+            start = week_start.toordinal()
+            technician_hours = {}
+            for technician in technicians:
+                hours = self.booked_hours(technician, start, start + 6)
+                technician_hours[technician] = {
+                    'booked_hours': round(hours, 2),
+                    'utilization': round(hours / TECHNICIAN_HOURS_PER_WEEK, 3)
+                }
+            weeks.append({'week': week_start.isoformat(), 'technicians': technician_hours})
+            week_start += timedelta(days=7)
+        return weeks
+
+
+class FleetReliability:
+    """Breakdown reliability of the fleet: mean time between breakdowns (MTBF),
+    downtime and cost percentiles and recurring issues.
+
+    Breakdowns are reduced to aggregates per truck and per (truck, issue
+    cluster): count, first and last breakdown day, downtime and cost. A
+    truck's MTBF is (last - first) / (dated breakdowns - 1) days, and groups
+    pool those spans and gaps. Building on a base folds new breakdowns into
+    its aggregates without rescanning the table; instances are not modified
+    after construction.
+    """
+
+    AGGREGATES = {'breakdowns': 'sum', 'dated': 'sum', 'first_day': 'min', 'last_day': 'max',
+                  'downtime_hours': 'sum', 'total_cost': 'sum'}
+
+    def __init__(self, otr_df, base=None):
+        events = self.breakdown_events(otr_df)
+        truck_events = events[events['truck_id'] != '']
+        self.truck_stats = self.aggregate(truck_events, ['truck_id'])
+        self.issue_stats = self.aggregate(truck_events, ['truck_id', 'issue'])
+        # Per-breakdown values, kept for the percentiles
+        self.event_parts = [events[['truck_id', 'downtime_hours', 'total_cost']]]
+
+        if base is not None:
+            self.truck_stats = self.combine(base.truck_stats, self.truck_stats, ['truck_id'])
+            self.issue_stats = self.combine(base.issue_stats, self.issue_stats, ['truck_id', 'issue'])
+            self.event_parts = base.event_parts + self.event_parts
+            if len(self.event_parts) > RELIABILITY_EVENT_PARTS:
+                self.event_parts = [pd.concat(self.event_parts, ignore_index=True)]
+
+    @staticmethod
+    def classify_issues(descriptions):
+        """Issue cluster of each description (ISSUE_CATEGORIES, else 'Other').
+
+        Descriptions repeat heavily, so each distinct one is matched once.
+        """
+        codes, uniques = pd.factorize(descriptions.fillna('').astype(str).str.lower())
+        distinct = pd.Series(uniques)
+        labels = pd.Series('Other', index=distinct.index, dtype=object)
+        unmatched = pd.Series(True, index=distinct.index)
+        for name, pattern in ISSUE_CATEGORIES:
+            matched = unmatched & distinct.str.contains(pattern, regex=True)
+            labels[matched] = name
+            unmatched &= ~matched
+        return pd.Series(labels.values[codes], index=descriptions.index)
+
+    @classmethod
+    def breakdown_events(cls, otr_df):
+        """truck_id, breakdown day (days since 1970-01-01), issue cluster, downtime and cost of each breakdown"""
+        df = otr_df.reindex(columns=RELIABILITY_COLUMNS)
+        days = (pd.to_datetime(df['breakdown_date'], errors='coerce') - pd.Timestamp('1970-01-01')).dt.days
+        return pd.DataFrame({
+            'truck_id': df['truck_id'].fillna('').astype(str).str.strip(),
+            'day': days.astype('float64'),
+            'issue': cls.classify_issues(df['issue_description']),
+            'downtime_hours': pd.to_numeric(df['downtime_hours'], errors='coerce'),
+            'total_cost': pd.to_numeric(df['total_cost'], errors='coerce'),
+        }, index=df.index)
+
+    @staticmethod
+    def aggregate(events, keys):
+        return events.groupby(keys).agg(
+            breakdowns=('day', 'size'), dated=('day', 'count'),
+            first_day=('day', 'min'), last_day=('day', 'max'),
+            downtime_hours=('downtime_hours', 'sum'), total_cost=('total_cost', 'sum'))
+
+    @classmethod
+    def combine(cls, stats, new_stats, keys):
+        """Merge two aggregate frames (touches only the keys, not the breakdowns)"""
+        if new_stats.empty:
+            return stats
+        if stats.empty:
+            return new_stats
+        return pd.concat([stats, new_stats]).groupby(level=keys).agg(cls.AGGREGATES)
+
+    @staticmethod
+    def with_mtbf(stats):
+        """Aggregates with the span and gap count between dated breakdowns, and MTBF in days"""
+        gaps = (stats['dated'] - 1).clip(lower=0)
+        span = (stats['last_day'] - stats['first_day']).fillna(0.0)
+        return stats.assign(span_days=span, gaps=gaps, mtbf_days=span / gaps.where(gaps > 0))
+
+    @staticmethod
+    def percentile_values(quantiles):
+        """{'p50': ..., 'p90': ...} from the RELIABILITY_PERCENTILES quantiles, None where missing"""
+        return {f'p{p}': (None if pd.isna(q) else round(float(q), 2))
+                for p, q in zip(RELIABILITY_PERCENTILES, quantiles)}
+
+    @classmethod
+    def percentiles(cls, values):
+        return cls.percentile_values(values.quantile([p / 100 for p in RELIABILITY_PERCENTILES]))
+
+    @staticmethod
+    def rows(df):
+        """Row dicts with missing values as None and floats rounded for display"""
+        df = df.round(2)
+        return frame_rows(df.astype(object).where(df.notna(), None))
+
+    @staticmethod
+    def day_dates(days):
+        return pd.to_datetime(days, unit='D').dt.strftime('%Y-%m-%d')
+
+    def group_report(self, trucks, events, key):
+        """MTBF, totals and percentiles per value of a truck column (make_model or engine_type)"""
+        groups = trucks.groupby(key).agg(
+            trucks=('breakdowns', 'size'), breakdowns=('breakdowns', 'sum'),
+            span_days=('span_days', 'sum'), gaps=('gaps', 'sum'),
+            downtime_hours=('downtime_hours', 'sum'), total_cost=('total_cost', 'sum'))
+        groups['mtbf_days'] = groups['span_days'] / groups['gaps'].where(groups['gaps'] > 0)
+
+        # One row per group with a (column, quantile) column each
+        quantiles = events.groupby(events['truck_id'].map(trucks[key]).rename(key))[
+            ['downtime_hours', 'total_cost']].quantile([p / 100 for p in RELIABILITY_PERCENTILES]).unstack()
+
+        rows = self.rows(groups.drop(columns=['span_days', 'gaps']).reset_index()
+                         .sort_values('breakdowns', ascending=False))
+        for row in rows:
+            row['downtime_percentiles'] = self.percentile_values(quantiles.loc[row[key], 'downtime_hours'])
+            row['cost_percentiles'] = self.percentile_values(quantiles.loc[row[key], 'total_cost'])
+        return rows
+
+    def report(self, trucks_df):
+        """Fleet, per-truck, per make/model and per engine type reliability, and issue clusters"""
+        trucks_df = trucks_df.reindex(columns=RELIABILITY_TRUCK_COLUMNS)
+        trucks_df = trucks_df.assign(truck_id=trucks_df['truck_id'].astype(str)).drop_duplicates('truck_id')
+        make_model = (trucks_df['make'].fillna('').astype(str) + ' ' + trucks_df['model'].fillna('').astype(str))
+        info = pd.DataFrame({
+            'truck_number': trucks_df['truck_number'].values,
+            'make_model': make_model.str.strip().replace('', 'Unknown').values,
+            'engine_type': trucks_df['engine_type'].fillna('').astype(str).str.strip().replace('', 'Unknown').values,
+        }, index=trucks_df['truck_id'].values)
+
+        trucks = self.with_mtbf(self.truck_stats).join(info)
+        trucks['make_model'] = trucks['make_model'].fillna('Unknown')
+        trucks['engine_type'] = trucks['engine_type'].fillna('Unknown')
+        events = pd.concat(self.event_parts, ignore_index=True)
+
+        gaps = trucks['gaps'].sum()
+        fleet = {
+            'breakdowns': len(events),
+            'trucks': len(trucks),
+            'mtbf_days': round(float(trucks['span_days'].sum() / gaps), 2) if gaps else None,
+            'downtime_hours': round(float(events['downtime_hours'].sum()), 2),
+            'total_cost': round(float(events['total_cost'].sum()), 2),
+            'downtime_percentiles': self.percentiles(events['downtime_hours']),
+            'cost_percentiles': self.percentiles(events['total_cost']),
+        }
+
+        # Least reliable trucks (shortest MTBF) first
+        per_truck = trucks.assign(first_breakdown=self.day_dates(trucks['first_day']),
+                                  last_breakdown=self.day_dates(trucks['last_day']))
+        per_truck = per_truck.sort_values(['mtbf_days', 'breakdowns'], ascending=[True, False])
+        per_truck = per_truck.rename_axis('truck_id').reset_index()[[
+            'truck_id', 'truck_number', 'make_model', 'engine_type', 'breakdowns',
+            'first_breakdown', 'last_breakdown', 'mtbf_days', 'downtime_hours', 'total_cost']]
+
+        issues = self.issue_stats.groupby(level='issue').agg(
+            breakdowns=('breakdowns', 'sum'), trucks=('breakdowns', 'size'),
+            downtime_hours=('downtime_hours', 'sum'), total_cost=('total_cost', 'sum'))
+        issues = issues.sort_values('breakdowns', ascending=False).reset_index()
+
+        recurring = self.with_mtbf(self.issue_stats)
+        recurring = recurring[recurring['breakdowns'] >= RECURRING_ISSUE_MIN].reset_index()
+        recurring = recurring.assign(
+            truck_number=recurring['truck_id'].map(info['truck_number']),
+            first_breakdown=self.day_dates(recurring['first_day']),
+            last_breakdown=self.day_dates(recurring['last_day']))
+        recurring = recurring.sort_values(['breakdowns', 'mtbf_days'], ascending=[False, True])[[
+            'truck_id', 'truck_number', 'issue', 'breakdowns', 'first_breakdown', 'last_breakdown',
+            'mtbf_days', 'downtime_hours', 'total_cost']]
+
+        return {
+            'fleet': fleet,
+            'trucks': self.rows(per_truck),
+            'make_models': self.group_report(trucks, events, 'make_model'),
+            'engine_types': self.group_report(trucks, events, 'engine_type'),
+            'issues': self.rows(issues),
+            'recurring_issues': self.rows(recurring),
+        }
+
+
 # Initialize data manager
 data_manager = TMSDataManager()
+change_log = TMSChangeLog()
+job_queue = TMSJobQueue()
+
+
+def insert_record(table, record):
+    """Append a record to a table and bump the table's version.
+
+    Both happen under the table's write lock, so a reader holding that lock
+    sees either neither or both (see get_fleet_reliability).
+    """
+    file_path = TABLE_FILES[table]
+    with data_manager.table_lock(file_path):
+        if not data_manager.append_record(file_path, record):
+            return False
+        change_log.record(table, 'insert', record=record)
+    return True
+
+# Shop schedule per terminal scope, rebuilt when the shop_jobs version changes
+shop_schedules = {}
+shop_schedules_lock = threading.Lock()
+
+
+def get_shop_schedule():
+    """ShopSchedule of the current terminal scope, cached by shop_jobs table version"""
+    terminal = current_terminal.get()
+    # Open jobs run through today, so the schedule also expires daily
+    version = (change_log.version('shop_jobs'), date.today())
+    with shop_schedules_lock:
+        cached = shop_schedules.get(terminal)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    schedule = ShopSchedule(data_manager.load_data(SHOP_JOBS_FILE, columns=SCHEDULE_COLUMNS))
+    with shop_schedules_lock:
+        shop_schedules[terminal] = (version, schedule)
+    return schedule
+
+
+# Fleet reliability and its report per terminal scope, kept current with the
+# otr_repairs table version
+fleet_reliability = {}
+reliability_reports = {}
+fleet_reliability_lock = threading.Lock()
+
+
+def get_fleet_reliability():
+    """FleetReliability of the current terminal scope, cached by otr_repairs table version.
+
+    When only inserts happened since the cached version, the inserted
+    records are folded in from the change log; any other change rebuilds it.
+    """
+    terminal = current_terminal.get()
+    version, position = change_log.version_position('otr_repairs')
+    with fleet_reliability_lock:
+        cached = fleet_reliability.get(terminal)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    reliability = None
+    if cached is not None:
+        # Only the part of the change log appended since the cached version is read
+        changes, tail_position = change_log.changes_since('otr_repairs', cached[0], cached[2])
+        if changes is not None and all(change['op'] == 'insert' for change in changes):
+            # Inserts made in a terminal scope only belong to that terminal
+            records = [change['record'] for change in changes
+                       if terminal is None or change.get('terminal') == terminal]
+            reliability = FleetReliability(pd.DataFrame(records), base=cached[1])
+            version = max([version] + [change['version'] for change in changes])
+            position = tail_position
+
+    if reliability is None:
+        # Under the write lock no row can be appended between reading the
+        # version and loading, so the rows loaded are exactly those up to it
+        with data_manager.table_lock(OTR_FILE):
+            version, position = change_log.version_position('otr_repairs')
+            otr_df = data_manager.load_data(OTR_FILE, columns=RELIABILITY_COLUMNS)
+        reliability = FleetReliability(otr_df)
+    with fleet_reliability_lock:
+        fleet_reliability[terminal] = (version, reliability, position)
+    return reliability
+
+
+def get_reliability_report():
+    """FleetReliability report of the current terminal scope, cached by otr_repairs and trucks versions"""
+    terminal = current_terminal.get()
+    versions = (change_log.version('otr_repairs'), change_log.version('trucks'))
+    with fleet_reliability_lock:
+        cached = reliability_reports.get(terminal)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+    report = get_fleet_reliability().report(data_manager.load_data(TRUCKS_FILE, columns=RELIABILITY_TRUCK_COLUMNS))
+    with fleet_reliability_lock:
+        reliability_reports[terminal] = (versions, report)
+    return report
 
 
 # Utility functions
@@ -140,13 +1826,9 @@ def allowed_file(filename):
 
 def get_dashboard_stats():
     """Get dashboard statistics"""
-    drivers_df = data_manager.load_data(DRIVERS_FILE)
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
-    trailers_df = data_manager.load_data(TRAILERS_FILE)
-    maintenance_df = data_manager.load_data(MAINTENANCE_FILE)
-    otr_df = data_manager.load_data(OTR_FILE)
-    pm_df = data_manager.load_data(PM_FILE)
-    shop_jobs_df = data_manager.load_data(SHOP_JOBS_FILE)
+    drivers_df, trucks_df, trailers_df, maintenance_df, otr_df, pm_df, shop_jobs_df = data_manager.load_many([
+        DRIVERS_FILE, TRUCKS_FILE, TRAILERS_FILE, MAINTENANCE_FILE, OTR_FILE, PM_FILE, SHOP_JOBS_FILE
+    ], columns={TABLE_FILES[table]: columns for table, columns in DASHBOARD_STATS_COLUMNS.items()})
 
     stats = {
         'total_drivers': len(drivers_df),
@@ -166,12 +1848,627 @@ def get_dashboard_stats():
     return stats
 
 
+def to_json_value(value):
+    """Convert numpy scalars to plain Python values for JSON encoding"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def frame_rows(df):
+    """Row dicts of a DataFrame built from its column arrays, missing values as None"""
+    if orjson is None:
+        # orjson writes NaN as null itself; the stdlib encoder would emit NaN
+        df = df.astype(object).where(df.notna(), None)
+    names = list(df.columns)
+    columns = [df[name].tolist() for name in names]
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def json_default(value):
+    """Encode values the JSON encoders do not handle natively"""
+    if isinstance(value, pd.DataFrame):
+        return frame_rows(value)
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def encode_json(obj):
+    """Serialize to JSON bytes, with orjson when installed and the stdlib encoder otherwise.
+
+    DataFrames are encoded as arrays of row objects by pandas' C encoder,
+    straight from the column arrays; they are spliced into the dicts holding
+    them. NaN and NaT become null, datetimes ISO 8601 strings and numpy
+    scalars plain values.
+    """
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_json(orient='records', date_format='iso', double_precision=15,
+                           force_ascii=False).encode('utf-8')
+    if isinstance(obj, dict) and any(isinstance(value, (pd.DataFrame, dict)) for value in obj.values()):
+        return b'{' + b','.join(encode_json(str(key)) + b':' + encode_json(value)
+                                for key, value in obj.items()) + b'}'
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=json_default).encode('utf-8')
+
+
+def json_response(obj, status=200):
+    """JSON response encoded with encode_json"""
+    return Response(encode_json(obj), status=status, mimetype='application/json')
+
+
+class DashboardStatsBroadcaster:
+    """Share one get_dashboard_stats computation across all open dashboards.
+
+    A single background thread recomputes the stats when a data file changes
+    (save_data write hook, or a changed mtime/size for writes made outside the
+    app) and pushes only the changed fields to every subscriber queue.
+    There is one broadcaster per terminal scope (None = company-wide).
+    """
+
+    def __init__(self, terminal=None, poll_interval=DASHBOARD_POLL_SECONDS):
+        self.terminal = terminal
+        self.poll_interval = poll_interval
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.stats = None
+        self.signature = None
+        self.thread = None
+
+    def table_signature(self):
+        """Cheap fingerprint of all data files, used to detect external edits"""
+        signature = []
+        paths = [path for file_path in TABLE_FILES.values() for _, path in data_manager.table_files(file_path)]
+        for file_path in paths:
+            try:
+                st = os.stat(file_path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def notify(self, file_path=None):
+        """Write hook: wake the broadcaster thread immediately"""
+        self.changed.set()
+
+    def subscribe(self, subscriber=None):
+        """Register a new dashboard; returns its queue and the current stats.
+
+        Any object with a put(delta) method can be passed as the subscriber.
+        """
+        if subscriber is None:
+            subscriber = queue.Queue()
+        with self.lock:
+            if self.stats is None:
+                self.refresh_locked()
+            self.subscribers.append(subscriber)
+            current = dict(self.stats)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='dashboard-stats', daemon=True)
+                self.thread.start()
+        return subscriber, current
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def refresh_locked(self):
+        """Recompute stats if the tables changed and return the changed fields"""
+        token = current_terminal.set(self.terminal)
+        try:
+            signature = self.table_signature()
+            if self.stats is not None and signature == self.signature:
+                return {}
+            stats = {key: to_json_value(value) for key, value in get_dashboard_stats().items()}
+        finally:
+            current_terminal.reset(token)
+
+        previous = self.stats or {}
+        delta = {key: value for key, value in stats.items() if previous.get(key) != value}
+        self.stats = stats
+        self.signature = signature
+        return delta
+
+    def run(self):
+        while True:
+            self.changed.wait(self.poll_interval)
+            self.changed.clear()
+            with self.lock:
+                if not self.subscribers:
+                    continue
+                try:
+                    delta = self.refresh_locked()
+                except Exception as e:
+                    print(f"Error refreshing dashboard stats: {str(e)}")
+                    continue
+                if delta:
+                    for subscriber in self.subscribers:
+                        subscriber.put(delta)
+
+
+dashboard_broadcasters = {}
+dashboard_broadcasters_lock = threading.Lock()
+
+
+def get_dashboard_broadcaster(terminal=None):
+    """Broadcaster shared by every dashboard open on the same terminal scope"""
+    with dashboard_broadcasters_lock:
+        if terminal not in dashboard_broadcasters:
+            dashboard_broadcasters[terminal] = DashboardStatsBroadcaster(terminal)
+        return dashboard_broadcasters[terminal]
+
+
+def notify_dashboards(file_path):
+    with dashboard_broadcasters_lock:
+        broadcasters = list(dashboard_broadcasters.values())
+    for broadcaster in broadcasters:
+        broadcaster.notify(file_path)
+
+
+data_manager.add_write_listener(notify_dashboards)
+
+
+def resolve_terminal(args, session_data):
+    """Terminal selected by ?terminal= or the session; None for company-wide"""
+    terminal = args.get('terminal', session_data.get('terminal'))
+    return terminal if terminal in data_manager.terminals() else None
+
+
+def request_date_range(args):
+    """(date_from, date_to) ISO dates from ?from=&to= or ?days=N; None when unbounded"""
+    bounds = []
+    for name in ('from', 'to'):
+        try:
+            bounds.append(date.fromisoformat(args.get(name, '')).isoformat())
+        except ValueError:
+            bounds.append(None)
+
+    days = args.get('days', type=int)
+    if days:
+        bounds[0] = (date.today() - timedelta(days=days)).isoformat()
+    return tuple(bounds)
+
+
+def lookup_column(df, key_column, table_df, *value_columns):
+    """Join value_columns of the first table_df row with the same key onto each row of df.
+
+    Several value columns are joined with spaces; unmatched rows get None.
+    """
+    needed = [key_column, *value_columns]
+    if df.empty or key_column not in df.columns or any(column not in table_df.columns for column in needed):
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+    values = table_df[value_columns[0]]
+    for column in value_columns[1:]:
+        values = values.astype(str) + ' ' + table_df[column].astype(str)
+
+    keys = table_df[key_column]
+    first = keys.notna() & ~keys.duplicated()
+    matched = df[key_column].map(pd.Series(values[first].values, index=keys[first].values))
+    return matched.astype(object).where(matched.notna(), None)
+
+
+class ReportPage:
+    """One page of a report section plus the totals of the whole section.
+
+    Iterating yields only the rows of the page; len() is the row count of
+    the whole section, so templates keep using |length and truthiness.
+    """
+
+    def __init__(self, rows, total_rows, sums, page, page_arg):
+        self.rows = rows
+        self.total_rows = total_rows
+        self.sums = sums
+        self.page = page
+        self.page_arg = page_arg
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return self.total_rows
+
+    @property
+    def pages(self):
+        return max((self.total_rows + REPORT_PAGE_ROWS - 1) // REPORT_PAGE_ROWS, 1)
+
+    def url(self, page):
+        """URL of the current report showing another page of this section"""
+        args = request.args.to_dict()
+        args[self.page_arg] = page
+        return url_for(request.endpoint, **{**request.view_args, **args})
+
+
+def build_report_page(file_path, record_cls, where, date_range, sum_columns, page_arg):
+    """Stream a history table once, totalling sum_columns and keeping one page of records.
+
+    Pages run newest first by the table's date column (records without a
+    date last); only the newest rows up to the end of the page are kept
+    while streaming.
+    """
+    page = max(request.args.get(page_arg, 1, type=int), 1)
+    start = (page - 1) * REPORT_PAGE_ROWS
+    stop = start + REPORT_PAGE_ROWS
+    date_column = PARTITION_DATE_COLUMNS[file_path]
+    order = ['_page_date', '_page_row']
+
+    newest = None
+    seen = 0
+    sums = dict.fromkeys(sum_columns, 0.0)
+    for chunk in data_manager.iter_chunks(file_path, *date_range, where=where):
+        for column in sum_columns:
+            if column in chunk.columns:
+                sums[column] += float(pd.to_numeric(chunk[column], errors='coerce').fillna(0).sum())
+        dates = chunk[date_column] if date_column in chunk.columns else pd.Series('', index=chunk.index)
+        # Same-day records: the most recently added first
+        chunk = chunk.assign(_page_date=dates.where(dates.notna(), '').astype(str),
+                             _page_row=np.arange(seen, seen + len(chunk)))
+        newest = chunk if newest is None else pd.concat([newest, chunk])
+        if len(newest) > stop:
+            newest = newest.sort_values(order, ascending=False).head(stop)
+        seen += len(chunk)
+
+    rows = []
+    if newest is not None:
+        rows = record_cls.from_frame(newest.sort_values(order, ascending=False).iloc[start:stop])
+    return ReportPage(rows, seen, sums, page, page_arg)
+
+
+@app.before_request
+def initialize_data_layer():
+    data_manager.ensure_ready()
+
+
+@app.before_request
+def scope_request_to_terminal():
+    g.terminal_token = current_terminal.set(resolve_terminal(request.args, session))
+
+
+@app.teardown_request
+def reset_terminal_scope(error=None):
+    token = g.pop('terminal_token', None)
+    if token is not None:
+        current_terminal.reset(token)
+
+
+@app.context_processor
+def inject_terminals():
+    return {'terminals': data_manager.terminals(), 'active_terminal': current_terminal.get()}
+
+
+def parse_backup_since(value):
+    """Accept an ISO timestamp or a backup ID/filename and return the datetime it refers to"""
+    match = re.search(r'(\d{8}_\d{6})', value)
+    if match:
+        return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+    return datetime.fromisoformat(value.replace('Z', ''))
+
+
+def build_incremental_backup(since, cutoff):
+    """Collect the records inserted since a datetime, per table.
+
+    The delta is taken from the change log rather than created_at: every
+    insert with a version above the table's version at that time is
+    included, so records added while a backup was being written are never
+    lost (at worst they are in both backups). Tables replaced or merged by
+    /import since then, or whose changes were rotated out of the log, are
+    exported in full.
+    """
+    versions = change_log.versions()
+    base_versions = change_log.versions_at(since.isoformat())
+    terminal = current_terminal.get()
+
+    tables, full = {}, []
+    for table in TABLE_FILES:
+        changes = None
+        if base_versions is not None:
+            changes, _ = change_log.changes_since(table, base_versions[table])
+        if changes is None or any(change['op'] != 'insert' for change in changes):
+            full.append(table)
+            continue
+
+        records = []
+        for change in changes:
+            # Inserts made in a terminal scope only belong to that terminal
+            if terminal is None or change.get('terminal') == terminal:
+                record = dict(change['record'])
+                if change.get('terminal'):
+                    record[TERMINAL_COLUMN] = change['terminal']
+                records.append(record)
+        tables[table] = {'mode': 'append', 'records': records}
+
+    for table, df in zip(full, data_manager.load_many([TABLE_FILES[table] for table in full])):
+        tables[table] = {'mode': 'replace', 'records': df}
+
+    return {
+        'backup_type': 'incremental',
+        'since': since.isoformat(),
+        'export_date': cutoff.isoformat(),
+        'versions': versions,
+        'tables': {table: tables[table] for table in TABLE_FILES}
+    }
+
+
+def apply_incremental_backup(backup):
+    """Apply an incremental backup on top of the current data; returns the tables written, by file path"""
+    written = {}
+    for table, delta in backup.get('tables', {}).items():
+        if table not in TABLE_FILES:
+            continue
+        file_path = TABLE_FILES[table]
+        delta_df = pd.DataFrame(delta['records'])
+
+        if delta['mode'] == 'replace':
+            data_manager.write_data(delta_df, file_path)
+            change_log.record(table, 'replace', rows=len(delta_df))
+            written[file_path] = delta_df
+        elif not delta_df.empty:
+            id_column = TABLE_ID_COLUMNS[table]
+            with data_manager.table_lock(file_path):
+                merged = pd.concat([data_manager.load_data(file_path), delta_df], ignore_index=True)
+                merged = merged.drop_duplicates(subset=[id_column], keep='last')
+                data_manager.write_data(merged, file_path)
+            change_log.record(table, 'merge', rows=len(delta_df))
+            written[file_path] = merged
+        else:
+            continue
+
+        data_manager.notify_write(file_path)
+    return written
+
+
+def prune_backups():
+    """Keep only the newest BACKUP_RETENTION_COUNT full and incremental backups"""
+    for prefix in ('tms_backup_', 'tms_incremental_'):
+        backups = sorted(
+            (os.path.join(UPLOAD_FOLDER, name) for name in os.listdir(UPLOAD_FOLDER) if name.startswith(prefix)),
+            key=os.path.getmtime, reverse=True
+        )
+        for old_backup in backups[BACKUP_RETENTION_COUNT:]:
+            try:
+                os.remove(old_backup)
+            except OSError as e:
+                print(f"Error removing old backup {old_backup}: {str(e)}")
+
+
+def reference_values(df, columns):
+    """Reference values of a frame as strings joined with spaces; missing or blank become NaN"""
+    values = None
+    for column in columns:
+        column_values = df[column].astype(str).str.strip().where(df[column].notna())
+        values = column_values if values is None else values + ' ' + column_values
+    return values.where(values != '')
+
+
+def find_orphans():
+    """Check every INTEGRITY_REFERENCES reference across the whole company in one pass.
+
+    Only id and reference columns are read, all tables concurrently. Each
+    reference column is factorized in one hash pass and only its distinct
+    values are normalized and matched against the referenced keys. Returns
+    the orphaned references as a DataFrame and per-reference counts.
+    """
+    columns = {}
+    for table, column, target, key_columns in INTEGRITY_REFERENCES:
+        columns.setdefault(table, [TABLE_ID_COLUMNS[table]]).append(column)
+        columns.setdefault(target, [TABLE_ID_COLUMNS[target]]).extend(key_columns)
+
+    token = current_terminal.set(None)
+    try:
+        frames = data_manager.load_many([TABLE_FILES[table] for table in columns], columns={
+            TABLE_FILES[table]: list(dict.fromkeys(table_columns)) for table, table_columns in columns.items()
+        })
+    finally:
+        current_terminal.reset(token)
+    tables = {table: df.reindex(columns=list(dict.fromkeys(columns[table] + list(df.columns))))
+              for table, df in zip(columns, frames)}
+
+    keys = {}
+    orphan_frames, references = [], []
+    for table, column, target, key_columns in INTEGRITY_REFERENCES:
+        key_name = f"{target}.{'+'.join(key_columns)}"
+        if key_name not in keys:
+            keys[key_name] = reference_values(tables[target], key_columns).dropna().unique()
+
+        df = tables[table]
+        codes, uniques = pd.factorize(df[column])
+        values = reference_values(pd.DataFrame({column: uniques}), [column])
+        present = (codes >= 0) & values.notna().values[codes]
+        orphaned = present & ~values.isin(keys[key_name]).values[codes]
+        references.append({'table': table, 'column': column, 'references': key_name,
+                           'checked': int(present.sum()), 'orphans': int(orphaned.sum())})
+        if orphaned.any():
+            orphan_frames.append(pd.DataFrame({
+                'table': table,
+                'record_id': df[TABLE_ID_COLUMNS[table]].values[orphaned],
+                'terminal': df[TERMINAL_COLUMN].values[orphaned] if TERMINAL_COLUMN in df.columns else None,
+                'column': column,
+                'value': values.values[codes[orphaned]],
+                'references': key_name,
+            }))
+
+    orphans_df = pd.concat(orphan_frames, ignore_index=True) if orphan_frames else pd.DataFrame(
+        columns=['table', 'record_id', 'terminal', 'column', 'value', 'references'])
+    return orphans_df, references
+
+
+def write_integrity_report():
+    """Check referential integrity and write ORPHANS_FILE and INTEGRITY_SUMMARY_FILE; returns the summary"""
+    orphans_df, references = find_orphans()
+    summary = {
+        'checked_at': datetime.now().isoformat(),
+        'orphans': len(orphans_df),
+        'references': references,
+    }
+
+    os.makedirs(INTEGRITY_DIR, exist_ok=True)
+    orphans_df.to_csv(ORPHANS_FILE + '.tmp', index=False)
+    os.replace(ORPHANS_FILE + '.tmp', ORPHANS_FILE)
+    with open(INTEGRITY_SUMMARY_FILE + '.tmp', 'w') as f:
+        json.dump(summary, f)
+    os.replace(INTEGRITY_SUMMARY_FILE + '.tmp', INTEGRITY_SUMMARY_FILE)
+
+    if len(orphans_df):
+        print(f"Integrity check found {len(orphans_df)} orphaned references, see {ORPHANS_FILE}")
+    return summary
+
+
+def integrity_job(report):
+    """Background job: check cross-table references and write the orphan report"""
+    report(10, 'Checking references')
+    return write_integrity_report()
+
+
+def export_job(report, since=None):
+    """Background job: write a full backup, or the changes since a datetime, to UPLOAD_FOLDER.
+
+    A backup is stamped (file name and export_date) with the time it was
+    started, before any table is read, so ?since=<backup ID> never skips a
+    change the backup itself does not hold.
+    """
+    cutoff = datetime.now()
+    report(10, 'Loading tables')
+    if since:
+        backup = build_incremental_backup(since, cutoff)
+        backup_filename = f"tms_incremental_{cutoff.strftime('%Y%m%d_%H%M%S')}.json.gz"
+        report(60, 'Writing incremental backup')
+        with gzip.open(os.path.join(UPLOAD_FOLDER, backup_filename), 'wb') as f:
+            f.write(encode_json(backup))
+    else:
+        versions = change_log.versions()
+        frames = data_manager.load_many(list(TABLE_FILES.values()))
+        all_data = dict(zip(TABLE_FILES, frames))
+        all_data['export_date'] = cutoff.isoformat()
+        all_data['versions'] = versions
+
+        backup_filename = f"tms_backup_{cutoff.strftime('%Y%m%d_%H%M%S')}.json"
+        report(60, 'Writing backup')
+        with open(os.path.join(UPLOAD_FOLDER, backup_filename), 'wb') as f:
+            f.write(encode_json(all_data))
+
+    prune_backups()
+    return {'file': backup_filename}
+
+
+def import_job(report, filepath):
+    """Background job: restore a full backup or apply an incremental one from an uploaded file"""
+    try:
+        report(5, 'Reading backup')
+        opener = gzip.open if filepath.endswith('.gz') else open
+        with opener(filepath, 'rt') as f:
+            import_data_dict = json.load(f)
+
+        if import_data_dict.get('backup_type') == 'incremental':
+            report(30, 'Applying incremental backup')
+            written = apply_incremental_backup(import_data_dict)
+            result = {'message': 'Incremental backup applied successfully!'}
+        else:
+            # Restore data
+            written = {}
+            for index, (table, file_path) in enumerate(TABLE_FILES.items()):
+                if table in import_data_dict:
+                    report(10 + 80 * index // len(TABLE_FILES), f'Restoring {table}')
+                    written[file_path] = pd.DataFrame(import_data_dict[table])
+                    data_manager.write_data(written[file_path], file_path)
+
+            for table, file_path in TABLE_FILES.items():
+                if table in import_data_dict:
+                    change_log.record(table, 'replace', rows=len(import_data_dict[table]))
+                    data_manager.notify_write(file_path)
+
+            result = {'message': 'Data imported successfully!'}
+
+        # The data is in; a failed check must not fail the import. A company-wide
+        # import's tables are still in memory, so the check does not read them back.
+        report(95, 'Checking references')
+        tables = {}
+        if current_terminal.get() is None:
+            tables = {data_manager.cache_key(file_path): df for file_path, df in written.items()}
+        token = prefetched_tables.set(tables)
+        try:
+            result['orphans'] = write_integrity_report()['orphans']
+            if result['orphans']:
+                result['message'] += f" {result['orphans']} references to missing records were found."
+        except Exception as e:
+            print(f"Error checking referential integrity: {str(e)}")
+        finally:
+            prefetched_tables.reset(token)
+        return result
+    finally:
+        # Clean up uploaded file
+        os.remove(filepath)
+
+
+def compact_job(report):
+    """Background job: partition and compact the history tables"""
+    summary = {}
+    tables = [table for table, file_path in TABLE_FILES.items() if file_path in PARTITION_DATE_COLUMNS]
+    for index, table in enumerate(tables):
+        report(100 * index // len(tables), f'Compacting {table}')
+        summary[table] = data_manager.compact_partitions(TABLE_FILES[table])
+    return summary
+
+
 # Routes
 @app.route('/')
 def dashboard():
     """Dashboard page"""
     stats = get_dashboard_stats()
-    return render_template('dashboard.html', stats=stats)
+    return render_template('dashboard.html', stats=stats, live_stats=DASHBOARD_STREAM)
+
+
+@app.route('/api/dashboard/stream')
+def dashboard_stream():
+    """Server-sent events stream of dashboard stat changes"""
+    if not DASHBOARD_STREAM:
+        # EventSource does not reconnect after a 204
+        return Response(status=204)
+    broadcaster = get_dashboard_broadcaster(current_terminal.get())
+    subscriber, current = broadcaster.subscribe()
+
+    def generate():
+        try:
+            yield f"event: stats\ndata: {json.dumps(current)}\n\n"
+            while True:
+                try:
+                    delta = subscriber.get(timeout=DASHBOARD_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: delta\ndata: {json.dumps(delta)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/terminals/<terminal>')
+def select_terminal(terminal):
+    """Scope the session to one terminal ('all' for company-wide)"""
+    if terminal == 'all':
+        session.pop('terminal', None)
+    elif terminal in data_manager.terminals():
+        session['terminal'] = terminal
+    else:
+        flash(f'Unknown terminal: {terminal}', 'error')
+    return redirect(request.referrer or url_for('dashboard'))
+
+
+@app.route('/api/terminals', methods=['GET', 'POST'])
+def api_terminals():
+    """API endpoint to list terminals, or create one (POST name=<terminal>)"""
+    if request.method == 'POST':
+        terminal = secure_filename(request.form.get('name', ''))
+        if not terminal or terminal == 'all':
+            return jsonify({'error': 'Invalid terminal name'}), 400
+        data_manager.create_terminal(terminal)
+    return jsonify(data_manager.terminals())
 
 
 # Driver Routes
@@ -179,7 +2476,7 @@ def dashboard():
 def drivers():
     """Drivers management page"""
     drivers_df = data_manager.load_data(DRIVERS_FILE)
-    drivers_list = drivers_df.to_dict('records') if not drivers_df.empty else []
+    drivers_list = Driver.from_frame(drivers_df)
     return render_template('drivers.html', drivers=drivers_list)
 
 
@@ -188,8 +2485,6 @@ def add_driver():
     """Add new driver"""
     if request.method == 'POST':
         try:
-            drivers_df = data_manager.load_data(DRIVERS_FILE)
-
             new_driver = {
                 'driver_id': data_manager.generate_id(),
                 'first_name': request.form['first_name'],
@@ -207,9 +2502,7 @@ def add_driver():
                 'created_at': datetime.now().isoformat()
             }
 
-            drivers_df = pd.concat([drivers_df, pd.DataFrame([new_driver])], ignore_index=True)
-
-            if data_manager.save_data(drivers_df, DRIVERS_FILE):
+            if insert_record('drivers', new_driver):
                 flash('Driver added successfully!', 'success')
                 return redirect(url_for('drivers'))
             else:
@@ -226,7 +2519,7 @@ def add_driver():
 def trucks():
     """Trucks management page"""
     trucks_df = data_manager.load_data(TRUCKS_FILE)
-    trucks_list = trucks_df.to_dict('records') if not trucks_df.empty else []
+    trucks_list = Truck.from_frame(trucks_df)
     return render_template('trucks.html', trucks=trucks_list)
 
 
@@ -235,8 +2528,6 @@ def add_truck():
     """Add new truck"""
     if request.method == 'POST':
         try:
-            trucks_df = data_manager.load_data(TRUCKS_FILE)
-
             new_truck = {
                 'truck_id': data_manager.generate_id(),
                 'truck_number': request.form['truck_number'],
@@ -255,9 +2546,7 @@ def add_truck():
                 'created_at': datetime.now().isoformat()
             }
 
-            trucks_df = pd.concat([trucks_df, pd.DataFrame([new_truck])], ignore_index=True)
-
-            if data_manager.save_data(trucks_df, TRUCKS_FILE):
+            if insert_record('trucks', new_truck):
                 flash('Truck added successfully!', 'success')
                 return redirect(url_for('trucks'))
             else:
@@ -267,7 +2556,7 @@ def add_truck():
             flash(f'Error adding truck: {str(e)}', 'error')
 
     # Load drivers for assignment dropdown
-    drivers_df = data_manager.load_data(DRIVERS_FILE)
+    drivers_df = data_manager.load_data(DRIVERS_FILE, columns=DRIVER_OPTION_COLUMNS)
     drivers_list = drivers_df.to_dict('records') if not drivers_df.empty else []
 
     return render_template('add_truck.html', drivers=drivers_list)
@@ -278,7 +2567,7 @@ def add_truck():
 def trailers():
     """Trailers management page"""
     trailers_df = data_manager.load_data(TRAILERS_FILE)
-    trailers_list = trailers_df.to_dict('records') if not trailers_df.empty else []
+    trailers_list = Trailer.from_frame(trailers_df)
     return render_template('trailers.html', trailers=trailers_list)
 
 
@@ -287,8 +2576,6 @@ def add_trailer():
     """Add new trailer"""
     if request.method == 'POST':
         try:
-            trailers_df = data_manager.load_data(TRAILERS_FILE)
-
             new_trailer = {
                 'trailer_id': data_manager.generate_id(),
                 'trailer_number': request.form['trailer_number'],
@@ -304,9 +2591,7 @@ def add_trailer():
                 'created_at': datetime.now().isoformat()
             }
 
-            trailers_df = pd.concat([trailers_df, pd.DataFrame([new_trailer])], ignore_index=True)
-
-            if data_manager.save_data(trailers_df, TRAILERS_FILE):
+            if insert_record('trailers', new_trailer):
                 flash('Trailer added successfully!', 'success')
                 return redirect(url_for('trailers'))
             else:
@@ -316,7 +2601,7 @@ def add_trailer():
             flash(f'Error adding trailer: {str(e)}', 'error')
 
     # Load trucks for assignment dropdown
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
+    trucks_df = data_manager.load_data(TRUCKS_FILE, columns=TRUCK_OPTION_COLUMNS)
     trucks_list = trucks_df.to_dict('records') if not trucks_df.empty else []
 
     return render_template('add_trailer.html', trucks=trucks_list)
@@ -326,33 +2611,21 @@ def add_trailer():
 @app.route('/otr')
 def otr_repairs():
     """OTR repairs management page"""
-    otr_df = data_manager.load_data(OTR_FILE)
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
-    drivers_df = data_manager.load_data(DRIVERS_FILE)
+    otr_df, trucks_df, drivers_df = data_manager.load_many([OTR_FILE, TRUCKS_FILE, DRIVERS_FILE],
+                                                           *request_date_range(request.args), columns={
+        TRUCKS_FILE: TRUCK_OPTION_COLUMNS,
+        DRIVERS_FILE: DRIVER_OPTION_COLUMNS
+    })
 
     # Add truck and driver names to OTR records
-    otr_list = []
-    if not otr_df.empty:
-        for _, row in otr_df.iterrows():
-            otr_record = row.to_dict()
-
-            # Add truck info
-            if not trucks_df.empty:
-                truck_info = trucks_df[trucks_df['truck_id'] == row['truck_id']]
-                if not truck_info.empty:
-                    otr_record['truck_number'] = truck_info.iloc[0]['truck_number']
-                    otr_record['truck_make_model'] = f"{truck_info.iloc[0]['make']} {truck_info.iloc[0]['model']}"
-
-            # Add driver info
-            if not drivers_df.empty:
-                driver_info = drivers_df[drivers_df['driver_id'] == row['driver_id']]
-                if not driver_info.empty:
-                    otr_record[
-                        'driver_name'] = f"{driver_info.iloc[0]['first_name']} {driver_info.iloc[0]['last_name']}"
+    otr_df = otr_df.assign(
+        truck_number=lookup_column(otr_df, 'truck_id', trucks_df, 'truck_number'),
+        truck_make_model=lookup_column(otr_df, 'truck_id', trucks_df, 'make', 'model'),
+        driver_name=lookup_column(otr_df, 'driver_id', drivers_df, 'first_name', 'last_name')
+    )
+    otr_list = OTRRepair.from_frame(otr_df)
 
-            otr_list.append(otr_record)
-
-    return render_template('otr_repairs.html', otr_repairs=otr_list)
+    return render_template('otr_repairs.html', otr_repairs=otr_list, reliability=get_reliability_report())
 
 
 @app.route('/otr/add', methods=['GET', 'POST'])
@@ -360,8 +2633,6 @@ def add_otr():
     """Add new OTR repair"""
     if request.method == 'POST':
         try:
-            otr_df = data_manager.load_data(OTR_FILE)
-
             repair_cost = float(request.form.get('repair_cost', 0))
             tow_cost = float(request.form.get('tow_cost', 0))
             hotel_cost = float(request.form.get('hotel_cost', 0))
@@ -388,9 +2659,7 @@ def add_otr():
                 'created_at': datetime.now().isoformat()
             }
 
-            otr_df = pd.concat([otr_df, pd.DataFrame([new_otr])], ignore_index=True)
-
-            if data_manager.save_data(otr_df, OTR_FILE):
+            if insert_record('otr_repairs', new_otr):
                 flash('OTR repair added successfully!', 'success')
                 return redirect(url_for('otr_repairs'))
             else:
@@ -400,8 +2669,10 @@ def add_otr():
             flash(f'Error adding OTR repair: {str(e)}', 'error')
 
     # Load trucks and drivers for dropdowns
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
-    drivers_df = data_manager.load_data(DRIVERS_FILE)
+    trucks_df, drivers_df = data_manager.load_many([TRUCKS_FILE, DRIVERS_FILE], columns={
+        TRUCKS_FILE: TRUCK_OPTION_COLUMNS,
+        DRIVERS_FILE: DRIVER_OPTION_COLUMNS
+    })
     trucks_list = trucks_df.to_dict('records') if not trucks_df.empty else []
     drivers_list = drivers_df.to_dict('records') if not drivers_df.empty else []
 
@@ -412,23 +2683,15 @@ def add_otr():
 @app.route('/pm')
 def pm_records():
     """PM records management page"""
-    pm_df = data_manager.load_data(PM_FILE)
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
+    pm_df, trucks_df = data_manager.load_many([PM_FILE, TRUCKS_FILE], *request_date_range(request.args),
+                                              columns={TRUCKS_FILE: TRUCK_OPTION_COLUMNS})
 
     # Add truck info to PM records
-    pm_list = []
-    if not pm_df.empty:
-        for _, row in pm_df.iterrows():
-            pm_record = row.to_dict()
-
-            # Add truck info
-            if not trucks_df.empty:
-                truck_info = trucks_df[trucks_df['truck_id'] == row['truck_id']]
-                if not truck_info.empty:
-                    pm_record['truck_number'] = truck_info.iloc[0]['truck_number']
-                    pm_record['truck_make_model'] = f"{truck_info.iloc[0]['make']} {truck_info.iloc[0]['model']}"
-
-            pm_list.append(pm_record)
+    pm_df = pm_df.assign(
+        truck_number=lookup_column(pm_df, 'truck_id', trucks_df, 'truck_number'),
+        truck_make_model=lookup_column(pm_df, 'truck_id', trucks_df, 'make', 'model')
+    )
+    pm_list = PMRecord.from_frame(pm_df)
 
     return render_template('pm_records.html', pm_records=pm_list)
 
@@ -438,8 +2701,6 @@ def add_pm():
     """Add new PM record"""
     if request.method == 'POST':
         try:
-            pm_df = data_manager.load_data(PM_FILE)
-
             parts_cost = float(request.form.get('parts_cost', 0))
             labor_cost = float(request.form.get('labor_cost', 0))
             total_cost = parts_cost + labor_cost
@@ -465,9 +2726,7 @@ def add_pm():
                 'created_at': datetime.now().isoformat()
             }
 
-            pm_df = pd.concat([pm_df, pd.DataFrame([new_pm])], ignore_index=True)
-
-            if data_manager.save_data(pm_df, PM_FILE):
+            if insert_record('pm_records', new_pm):
                 flash('PM record added successfully!', 'success')
                 return redirect(url_for('pm_records'))
             else:
@@ -477,7 +2736,7 @@ def add_pm():
             flash(f'Error adding PM record: {str(e)}', 'error')
 
     # Load trucks for dropdown
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
+    trucks_df = data_manager.load_data(TRUCKS_FILE, columns=TRUCK_OPTION_COLUMNS)
     trucks_list = trucks_df.to_dict('records') if not trucks_df.empty else []
 
     return render_template('add_pm.html', trucks=trucks_list)
@@ -487,31 +2746,25 @@ def add_pm():
 @app.route('/shop_jobs')
 def shop_jobs():
     """Shop jobs management page"""
-    shop_jobs_df = data_manager.load_data(SHOP_JOBS_FILE)
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
-    trailers_df = data_manager.load_data(TRAILERS_FILE)
+    shop_jobs_df, trucks_df, trailers_df = data_manager.load_many([SHOP_JOBS_FILE, TRUCKS_FILE, TRAILERS_FILE],
+                                                                  *request_date_range(request.args), columns={
+        TRUCKS_FILE: TRUCK_OPTION_COLUMNS,
+        TRAILERS_FILE: TRAILER_OPTION_COLUMNS
+    })
 
     # Add truck and trailer info to shop jobs
-    shop_jobs_list = []
-    if not shop_jobs_df.empty:
-        for _, row in shop_jobs_df.iterrows():
-            job_record = row.to_dict()
-
-            # Add truck info
-            if row['truck_id'] and not trucks_df.empty:
-                truck_info = trucks_df[trucks_df['truck_id'] == row['truck_id']]
-                if not truck_info.empty:
-                    job_record['truck_number'] = truck_info.iloc[0]['truck_number']
-
-            # Add trailer info
-            if row['trailer_id'] and not trailers_df.empty:
-                trailer_info = trailers_df[trailers_df['trailer_id'] == row['trailer_id']]
-                if not trailer_info.empty:
-                    job_record['trailer_number'] = trailer_info.iloc[0]['trailer_number']
+    shop_jobs_df = shop_jobs_df.assign(
+        truck_number=lookup_column(shop_jobs_df, 'truck_id', trucks_df, 'truck_number'),
+        trailer_number=lookup_column(shop_jobs_df, 'trailer_id', trailers_df, 'trailer_number')
+    )
+    shop_jobs_list = ShopJob.from_frame(shop_jobs_df)
 
-            shop_jobs_list.append(job_record)
+    # Technician workload this week and open backlog
+    schedule = get_shop_schedule()
+    today = date.today()
+    workload = schedule.utilization(today, today)[0]
 
-    return render_template('shop_jobs.html', shop_jobs=shop_jobs_list)
+    return render_template('shop_jobs.html', shop_jobs=shop_jobs_list, backlog=schedule.backlog, workload=workload)
 
 
 @app.route('/shop_jobs/add', methods=['GET', 'POST'])
@@ -519,8 +2772,6 @@ def add_shop_job():
     """Add new shop job"""
     if request.method == 'POST':
         try:
-            shop_jobs_df = data_manager.load_data(SHOP_JOBS_FILE)
-
             parts_cost = float(request.form.get('parts_cost', 0))
             labor_cost = float(request.form.get('labor_cost', 0))
             total_cost = parts_cost + labor_cost
@@ -545,9 +2796,7 @@ def add_shop_job():
                 'created_at': datetime.now().isoformat()
             }
 
-            shop_jobs_df = pd.concat([shop_jobs_df, pd.DataFrame([new_shop_job])], ignore_index=True)
-
-            if data_manager.save_data(shop_jobs_df, SHOP_JOBS_FILE):
+            if insert_record('shop_jobs', new_shop_job):
                 flash('Shop job added successfully!', 'success')
                 return redirect(url_for('shop_jobs'))
             else:
@@ -557,8 +2806,10 @@ def add_shop_job():
             flash(f'Error adding shop job: {str(e)}', 'error')
 
     # Load trucks and trailers for dropdowns
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
-    trailers_df = data_manager.load_data(TRAILERS_FILE)
+    trucks_df, trailers_df = data_manager.load_many([TRUCKS_FILE, TRAILERS_FILE], columns={
+        TRUCKS_FILE: TRUCK_OPTION_COLUMNS,
+        TRAILERS_FILE: TRAILER_OPTION_COLUMNS
+    })
     trucks_list = trucks_df.to_dict('records') if not trucks_df.empty else []
     trailers_list = trailers_df.to_dict('records') if not trailers_df.empty else []
 
@@ -575,12 +2826,8 @@ def search():
 @app.route('/search/truck/<truck_id>')
 def truck_report(truck_id):
     """Generate truck report"""
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
-    maintenance_df = data_manager.load_data(MAINTENANCE_FILE)
-    otr_df = data_manager.load_data(OTR_FILE)
-    pm_df = data_manager.load_data(PM_FILE)
-    shop_jobs_df = data_manager.load_data(SHOP_JOBS_FILE)
-    drivers_df = data_manager.load_data(DRIVERS_FILE)
+    date_range = request_date_range(request.args)
+    trucks_df = data_manager.load_data(TRUCKS_FILE, where={'truck_id': truck_id})
 
     # Get truck info
     truck_info = trucks_df[trucks_df['truck_id'] == truck_id]
@@ -590,17 +2837,19 @@ def truck_report(truck_id):
 
     truck = truck_info.iloc[0].to_dict()
 
-    # Get related records
-    truck_maintenance = maintenance_df[maintenance_df['truck_id'] == truck_id].to_dict('records')
-    truck_otr = otr_df[otr_df['truck_id'] == truck_id].to_dict('records')
-    truck_pm = pm_df[pm_df['truck_id'] == truck_id].to_dict('records')
-    truck_shop = shop_jobs_df[shop_jobs_df['truck_id'] == truck_id].to_dict('records')
+    # Get related records, one page per section
+    where = {'truck_id': truck_id}
+    truck_maintenance = build_report_page(MAINTENANCE_FILE, MaintenanceRecord, where, date_range,
+                                          ['total_cost'], 'maintenance_page')
+    truck_otr = build_report_page(OTR_FILE, OTRRepair, where, date_range, ['total_cost'], 'otr_page')
+    truck_pm = build_report_page(PM_FILE, PMRecord, where, date_range, ['total_cost'], 'pm_page')
+    truck_shop = build_report_page(SHOP_JOBS_FILE, ShopJob, where, date_range, ['total_cost'], 'shop_page')
 
     # Calculate totals
-    total_maintenance_cost = sum(float(record.get('total_cost', 0)) for record in truck_maintenance)
-    total_otr_cost = sum(float(record.get('total_cost', 0)) for record in truck_otr)
-    total_pm_cost = sum(float(record.get('total_cost', 0)) for record in truck_pm)
-    total_shop_cost = sum(float(record.get('total_cost', 0)) for record in truck_shop)
+    total_maintenance_cost = truck_maintenance.sums['total_cost']
+    total_otr_cost = truck_otr.sums['total_cost']
+    total_pm_cost = truck_pm.sums['total_cost']
+    total_shop_cost = truck_shop.sums['total_cost']
 
     totals = {
         'maintenance': total_maintenance_cost,
@@ -610,7 +2859,7 @@ def truck_report(truck_id):
         'grand_total': total_maintenance_cost + total_otr_cost + total_pm_cost + total_shop_cost
     }
 
-    return render_template('truck_report.html',
+    return stream_template('truck_report.html',
                            truck=truck,
                            maintenance=truck_maintenance,
                            otr_repairs=truck_otr,
@@ -622,9 +2871,9 @@ def truck_report(truck_id):
 @app.route('/search/driver/<driver_id>')
 def driver_report(driver_id):
     """Generate driver report"""
-    drivers_df = data_manager.load_data(DRIVERS_FILE)
-    otr_df = data_manager.load_data(OTR_FILE)
-    trucks_df = data_manager.load_data(TRUCKS_FILE)
+    drivers_df, trucks_df = data_manager.load_many([DRIVERS_FILE, TRUCKS_FILE], where={
+        DRIVERS_FILE: {'driver_id': driver_id}
+    })
 
     # Get driver info
     driver_info = drivers_df[drivers_df['driver_id'] == driver_id]
@@ -639,12 +2888,13 @@ def driver_report(driver_id):
     assigned_truck = trucks_df[trucks_df['assigned_driver'] == driver_name]
     truck = assigned_truck.iloc[0].to_dict() if not assigned_truck.empty else None
 
-    # Get OTR records
-    driver_otr = otr_df[otr_df['driver_id'] == driver_id].to_dict('records')
+    # Get OTR records, one page at a time
+    driver_otr = build_report_page(OTR_FILE, OTRRepair, {'driver_id': driver_id},
+                                   request_date_range(request.args), ['total_cost', 'downtime_hours'], 'otr_page')
 
     # Calculate totals
-    total_otr_cost = sum(float(record.get('total_cost', 0)) for record in driver_otr)
-    total_downtime = sum(float(record.get('downtime_hours', 0)) for record in driver_otr)
+    total_otr_cost = driver_otr.sums['total_cost']
+    total_downtime = driver_otr.sums['downtime_hours']
 
     totals = {
         'otr_cases': len(driver_otr),
@@ -652,7 +2902,7 @@ def driver_report(driver_id):
         'downtime_hours': total_downtime
     }
 
-    return render_template('driver_report.html',
+    return stream_template('driver_report.html',
                            driver=driver,
                            truck=truck,
                            otr_repairs=driver_otr,
@@ -662,9 +2912,8 @@ def driver_report(driver_id):
 @app.route('/search/trailer/<trailer_id>')
 def trailer_report(trailer_id):
     """Generate trailer report"""
-    trailers_df = data_manager.load_data(TRAILERS_FILE)
-    maintenance_df = data_manager.load_data(MAINTENANCE_FILE)
-    shop_jobs_df = data_manager.load_data(SHOP_JOBS_FILE)
+    date_range = request_date_range(request.args)
+    trailers_df = data_manager.load_data(TRAILERS_FILE, where={'trailer_id': trailer_id})
 
     # Get trailer info
     trailer_info = trailers_df[trailers_df['trailer_id'] == trailer_id]
@@ -674,13 +2923,15 @@ def trailer_report(trailer_id):
 
     trailer = trailer_info.iloc[0].to_dict()
 
-    # Get related records
-    trailer_maintenance = maintenance_df[maintenance_df['trailer_id'] == trailer_id].to_dict('records')
-    trailer_shop = shop_jobs_df[shop_jobs_df['trailer_id'] == trailer_id].to_dict('records')
+    # Get related records, one page per section
+    where = {'trailer_id': trailer_id}
+    trailer_maintenance = build_report_page(MAINTENANCE_FILE, MaintenanceRecord, where, date_range,
+                                            ['total_cost'], 'maintenance_page')
+    trailer_shop = build_report_page(SHOP_JOBS_FILE, ShopJob, where, date_range, ['total_cost'], 'shop_page')
 
     # Calculate totals
-    total_maintenance_cost = sum(float(record.get('total_cost', 0)) for record in trailer_maintenance)
-    total_shop_cost = sum(float(record.get('total_cost', 0)) for record in trailer_shop)
+    total_maintenance_cost = trailer_maintenance.sums['total_cost']
+    total_shop_cost = trailer_shop.sums['total_cost']
 
     totals = {
         'maintenance': total_maintenance_cost,
@@ -688,7 +2939,7 @@ def trailer_report(trailer_id):
         'total': total_maintenance_cost + total_shop_cost
     }
 
-    return render_template('trailer_report.html',
+    return stream_template('trailer_report.html',
                            trailer=trailer,
                            maintenance=trailer_maintenance,
                            shop_jobs=trailer_shop,
@@ -700,55 +2951,150 @@ def trailer_report(trailer_id):
 def api_trucks():
     """API endpoint to get trucks list"""
     trucks_df = data_manager.load_data(TRUCKS_FILE)
-    trucks_list = trucks_df.to_dict('records') if not trucks_df.empty else []
-    return jsonify(trucks_list)
+    return json_response(trucks_df)
 
 
 @app.route('/api/drivers')
 def api_drivers():
     """API endpoint to get drivers list"""
     drivers_df = data_manager.load_data(DRIVERS_FILE)
-    drivers_list = drivers_df.to_dict('records') if not drivers_df.empty else []
-    return jsonify(drivers_list)
+    return json_response(drivers_df)
 
 
 @app.route('/api/trailers')
 def api_trailers():
     """API endpoint to get trailers list"""
     trailers_df = data_manager.load_data(TRAILERS_FILE)
-    trailers_list = trailers_df.to_dict('records') if not trailers_df.empty else []
-    return jsonify(trailers_list)
+    return json_response(trailers_df)
+
+
+def schedule_date_range(default_days):
+    """Dates of ?from=&to= (or ?days=N) for the scheduler APIs; defaults to the last default_days days"""
+    date_from, date_to = request_date_range(request.args)
+    date_to = date.fromisoformat(date_to) if date_to else date.today()
+    date_from = date.fromisoformat(date_from) if date_from else date_to - timedelta(days=default_days)
+    return date_from, date_to
+
+
+@app.route('/api/technicians/free')
+def api_free_technicians():
+    """API endpoint listing the technicians with no shop job between ?from= and ?to= (default today)"""
+    date_from, date_to = schedule_date_range(0)
+    if date_from > date_to:
+        return jsonify({'error': 'from must not be after to'}), 400
+    return jsonify(get_shop_schedule().free_technicians(date_from, date_to))
+
+
+@app.route('/api/technicians/utilization')
+def api_technician_utilization():
+    """API endpoint with weekly booked hours and utilization per technician (?technician= to filter)"""
+    date_from, date_to = schedule_date_range(28)
+    if date_from > date_to:
+        return jsonify({'error': 'from must not be after to'}), 400
+    technicians = request.args.getlist('technician') or None
+    return jsonify(get_shop_schedule().utilization(date_from, date_to, technicians))
+
+
+@app.route('/api/shop_jobs/backlog')
+def api_shop_backlog():
+    """API endpoint with the open shop jobs and labor hours per priority"""
+    return jsonify(get_shop_schedule().backlog)
+
+
+@app.route('/api/reliability')
+def api_reliability():
+    """API endpoint with MTBF, downtime and cost percentiles and recurring issues from the OTR repairs"""
+    return jsonify(get_reliability_report())
+
+
+@app.route('/api/versions')
+def api_versions():
+    """API endpoint to get the current version of every table"""
+    return jsonify(change_log.versions())
+
+
+@app.route('/api/changes/<table>')
+def api_changes(table):
+    """API endpoint to get the changes to a table since ?since=<version>"""
+    if table not in TABLE_FILES:
+        return jsonify({'error': f'Unknown table: {table}'}), 404
+
+    since = request.args.get('since', 0, type=int)
+    version = change_log.version(table)
+    changes, _ = change_log.changes_since(table, since)
+    if changes is None:
+        return jsonify({'table': table, 'version': version,
+                        'error': f'Changes after version {since} are no longer in the change log'}), 410
+    return jsonify({
+        'table': table,
+        'version': version,
+        'changes': changes
+    })
+
+
+@app.route('/api/partitions/compact', methods=['POST'])
+def api_compact_partitions():
+    """API endpoint to partition and compact the history tables (runs as a background job)"""
+    job_id = job_queue.submit('compact', compact_job)
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+
+@app.route('/api/integrity')
+def api_integrity():
+    """API endpoint with the last referential integrity check and its first orphans"""
+    if not os.path.exists(INTEGRITY_SUMMARY_FILE):
+        return jsonify({'error': 'No integrity check has run yet'}), 404
+
+    with open(INTEGRITY_SUMMARY_FILE, 'r') as f:
+        summary = json.load(f)
+    summary['sample'] = pd.read_csv(ORPHANS_FILE, nrows=INTEGRITY_SAMPLE_ROWS)
+    return json_response(summary)
+
+
+@app.route('/api/integrity/check', methods=['POST'])
+def api_integrity_check():
+    """API endpoint to check referential integrity and rewrite the orphan report (runs as a background job)"""
+    job_id = job_queue.submit('integrity', integrity_job)
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Progress of a background job"""
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+    if status['kind'] == 'export' and status['status'] == 'finished':
+        status['download_url'] = url_for('job_download', job_id=job_id)
+    return jsonify(status)
+
+
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    """Download the backup written by a finished export job"""
+    status = job_queue.status(job_id)
+    if status is None or status['kind'] != 'export' or status['status'] != 'finished':
+        flash('Export not available!', 'error')
+        return redirect(url_for('import_data'))
+    backup_filename = status['result']['file']
+    return send_file(os.path.join(UPLOAD_FOLDER, backup_filename), as_attachment=True,
+                     download_name=backup_filename)
 
 
 # Data Export/Import Routes
 @app.route('/export')
 def export_data():
-    """Export all data to JSON"""
+    """Export all data to JSON, or only the changes since ?since=<timestamp or backup ID> (as a background job)"""
     try:
-        all_data = {
-            'drivers': data_manager.load_data(DRIVERS_FILE).to_dict('records'),
-            'trucks': data_manager.load_data(TRUCKS_FILE).to_dict('records'),
-            'trailers': data_manager.load_data(TRAILERS_FILE).to_dict('records'),
-            'maintenance': data_manager.load_data(MAINTENANCE_FILE).to_dict('records'),
-            'otr_repairs': data_manager.load_data(OTR_FILE).to_dict('records'),
-            'pm_records': data_manager.load_data(PM_FILE).to_dict('records'),
-            'shop_jobs': data_manager.load_data(SHOP_JOBS_FILE).to_dict('records'),
-            'export_date': datetime.now().isoformat()
-        }
-
-        # Create backup file
-        backup_filename = f"tms_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        backup_path = os.path.join(UPLOAD_FOLDER, backup_filename)
-
-        with open(backup_path, 'w') as f:
-            json.dump(all_data, f, indent=2, default=str)
-
-        return send_file(backup_path, as_attachment=True, download_name=backup_filename)
-
-    except Exception as e:
+        since = request.args.get('since')
+        since = parse_backup_since(since) if since else None
+    except ValueError as e:
         flash(f'Export failed: {str(e)}', 'error')
         return redirect(url_for('dashboard'))
 
+    job_id = job_queue.submit('export', export_job, since)
+    return redirect(url_for('import_data', job=job_id))
+
 
 @app.route('/import', methods=['GET', 'POST'])
 def import_data():
@@ -765,47 +3111,21 @@ def import_data():
 
         if file and allowed_file(file.filename):
             try:
-                filename = secure_filename(file.filename)
+                # Unique upload name, as several imports may be queued at once
+                filename = f"import_{uuid.uuid4().hex}_{secure_filename(file.filename)}"
                 filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                 file.save(filepath)
-
-                with open(filepath, 'r') as f:
-                    import_data_dict = json.load(f)
-
-                # Restore data
-                if 'drivers' in import_data_dict:
-                    pd.DataFrame(import_data_dict['drivers']).to_csv(DRIVERS_FILE, index=False)
-
-                if 'trucks' in import_data_dict:
-                    pd.DataFrame(import_data_dict['trucks']).to_csv(TRUCKS_FILE, index=False)
-
-                if 'trailers' in import_data_dict:
-                    pd.DataFrame(import_data_dict['trailers']).to_csv(TRAILERS_FILE, index=False)
-
-                if 'maintenance' in import_data_dict:
-                    pd.DataFrame(import_data_dict['maintenance']).to_csv(MAINTENANCE_FILE, index=False)
-
-                if 'otr_repairs' in import_data_dict:
-                    pd.DataFrame(import_data_dict['otr_repairs']).to_csv(OTR_FILE, index=False)
-
-                if 'pm_records' in import_data_dict:
-                    pd.DataFrame(import_data_dict['pm_records']).to_csv(PM_FILE, index=False)
-
-                if 'shop_jobs' in import_data_dict:
-                    pd.DataFrame(import_data_dict['shop_jobs']).to_csv(SHOP_JOBS_FILE, index=False)
-
-                flash('Data imported successfully!', 'success')
-
-                # Clean up uploaded file
-                os.remove(filepath)
-
             except Exception as e:
                 flash(f'Import failed: {str(e)}', 'error')
+                return render_template('import_data.html')
+
+            job_id = job_queue.submit('import', import_job, filepath)
+            return redirect(url_for('import_data', job=job_id))
 
         else:
-            flash('Invalid file type. Please upload a JSON file.', 'error')
+            flash('Invalid file type. Please upload a JSON or .json.gz file.', 'error')
 
-    return render_template('import_data.html')
+    return render_template('import_data.html', job=job_queue.status(request.args.get('job', '')))
 
 
 # Error handlers
@@ -819,5 +3139,50 @@ def internal_error(error):
     return render_template('500.html'), 500
 
 
+warm_up_lock = threading.Lock()
+warm_up_thread = None
+
+
+def warm_up():
+    """Preload pandas, the version counters and the company-wide shop schedule, reliability report and dashboard stats"""
+    started = time.perf_counter()
+    try:
+        data_manager.ensure_ready()
+        change_log.versions()
+        get_shop_schedule()
+        get_reliability_report()
+        broadcaster = get_dashboard_broadcaster()
+        with broadcaster.lock:
+            broadcaster.refresh_locked()
+    except Exception as e:
+        print(f"Error during warm-up: {str(e)}")
+        return
+    print(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+
+def start_warm_up():
+    """Run warm_up once, on a background thread"""
+    global warm_up_thread
+    with warm_up_lock:
+        if warm_up_thread is None:
+            warm_up_thread = threading.Thread(target=warm_up, name='tms-warm-up', daemon=True)
+            warm_up_thread.start()
+        return warm_up_thread
+
+
+def create_app(warm_up=None):
+    """Application factory for servers, e.g. gunicorn -k gthread --threads 16 'app:create_app()'.
+
+    Importing this module is cheap: pandas and the data files are only
+    touched by the first request. With warm_up (default: the TMS_WARM_UP
+    environment variable) that work is started right away in the background.
+    """
+    if warm_up is None:
+        warm_up = os.environ.get('TMS_WARM_UP', '') not in ('', '0')
+    if warm_up:
+        start_warm_up()
+    return app
+
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
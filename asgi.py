@@ -0,0 +1,227 @@
+# asgi.py - Optional ASGI entry point
+#
+# Run with:  uvicorn asgi:application --workers 1
+#
+# Tables needed by the read pages and /api/* are loaded off the event loop on
+# the data manager's bounded thread pool, and concurrent requests for the same
+# table share a single in-flight read. The Flask view then renders from those
+# preloaded tables, so no request blocks the loop on CSV parsing.
+import asyncio
+import contextvars
+import io
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app, create_app, data_manager, get_dashboard_broadcaster, prefetched_tables, current_terminal, \
+    resolve_terminal, request_date_range, TABLE_FILES, DASHBOARD_KEEPALIVE_SECONDS, DASHBOARD_STATS_COLUMNS, \
+    DRIVER_OPTION_COLUMNS, TRUCK_OPTION_COLUMNS, TRAILER_OPTION_COLUMNS, RELIABILITY_TRUCK_COLUMNS
+
+# Bounded pool for running the (now disk-free) Flask views
+RENDER_WORKERS = 8
+
+# Read route -> {table: columns its view loads (None for all)}. Only those
+# columns are parsed; they must cover every column the view asks for.
+READ_ROUTES = [
+    (re.compile(r'^/$'), DASHBOARD_STATS_COLUMNS),
+    (re.compile(r'^/drivers$'), {'drivers': None}),
+    (re.compile(r'^/trucks$'), {'trucks': None}),
+    (re.compile(r'^/trailers$'), {'trailers': None}),
+    # The page's reliability report also reads the trucks' engine types
+    (re.compile(r'^/otr$'), {'otr_repairs': None, 'drivers': DRIVER_OPTION_COLUMNS,
+                             'trucks': list(dict.fromkeys(TRUCK_OPTION_COLUMNS + RELIABILITY_TRUCK_COLUMNS))}),
+    (re.compile(r'^/pm$'), {'pm_records': None, 'trucks': TRUCK_OPTION_COLUMNS}),
+    (re.compile(r'^/shop_jobs$'), {'shop_jobs': None, 'trucks': TRUCK_OPTION_COLUMNS,
+                                   'trailers': TRAILER_OPTION_COLUMNS}),
+    # Reports stream their history sections chunk by chunk, so only the
+    # entity tables are preloaded
+    (re.compile(r'^/search/truck/[^/]+$'), {'trucks': None}),
+    (re.compile(r'^/search/driver/[^/]+$'), {'drivers': None, 'trucks': None}),
+    (re.compile(r'^/search/trailer/[^/]+$'), {'trailers': None}),
+    (re.compile(r'^/api/trucks$'), {'trucks': None}),
+    (re.compile(r'^/api/drivers$'), {'drivers': None}),
+    (re.compile(r'^/api/trailers$'), {'trailers': None}),
+]
+
+render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix='tms-render')
+
+
+def tables_for(method, path):
+    """Return the tables (and their columns) a GET read route needs, or None for other requests"""
+    if method not in ('GET', 'HEAD'):
+        return None
+    for pattern, tables in READ_ROUTES:
+        if pattern.match(path):
+            return tables
+    return None
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            continue
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def run_wsgi(environ):
+    """Call the Flask app and collect the full response"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    result = app(environ, start_response)
+    try:
+        response['body'] = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+def request_scope(environ):
+    """Terminal scope (?terminal= or the Flask session) and date range of a request"""
+    flask_request = app.request_class(dict(environ))
+    session_data = app.session_interface.open_session(app, flask_request) or {}
+    return resolve_terminal(flask_request.args, session_data), request_date_range(flask_request.args)
+
+
+async def prefetch(tables, terminal, date_range):
+    """Load the given tables ({table: columns}) concurrently without blocking the event loop"""
+    paths = [TABLE_FILES[table] for table in tables]
+    token = current_terminal.set(terminal)
+    try:
+        frames = await asyncio.gather(*(data_manager.load_data_async(TABLE_FILES[table], *date_range, columns=columns)
+                                        for table, columns in tables.items()))
+        return {data_manager.cache_key(path, *date_range): df for path, df in zip(paths, frames)}
+    finally:
+        current_terminal.reset(token)
+
+
+class AsyncSubscriber:
+    """Dashboard broadcaster subscriber that hands deltas to an asyncio queue"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, delta):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, delta)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def dashboard_stream(receive, send, terminal):
+    """Native async version of /api/dashboard/stream; ends when the client disconnects"""
+    loop = asyncio.get_running_loop()
+    subscriber = AsyncSubscriber(loop)
+    broadcaster = get_dashboard_broadcaster(terminal)
+    _, current = await loop.run_in_executor(render_pool, broadcaster.subscribe, subscriber)
+    # Sends to a closed connection do not fail, so watch for the disconnect
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    next_delta = None
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'more_body': True,
+                    'body': f"event: stats\ndata: {json.dumps(current)}\n\n".encode()})
+        while True:
+            if next_delta is None:
+                next_delta = asyncio.ensure_future(subscriber.queue.get())
+            done, _ = await asyncio.wait({next_delta, disconnected}, timeout=DASHBOARD_KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                break
+            if next_delta in done:
+                chunk = f"event: delta\ndata: {json.dumps(next_delta.result())}\n\n"
+                next_delta = None
+            else:
+                chunk = ": keepalive\n\n"
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+    finally:
+        for task in (next_delta, disconnected):
+            if task is not None:
+                task.cancel()
+        broadcaster.unsubscribe(subscriber)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            create_app()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            render_pool.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    body = await read_body(receive)
+    environ = build_environ(scope, body)
+
+    if scope['method'] == 'GET' and scope['path'] == '/api/dashboard/stream':
+        return await dashboard_stream(receive, send, request_scope(environ)[0])
+
+    tables = tables_for(scope['method'], scope['path'])
+    frames = await prefetch(tables, *request_scope(environ)) if tables else {}
+
+    context = contextvars.copy_context()
+    context.run(prefetched_tables.set, frames)
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(render_pool, context.run, run_wsgi, environ)
+
+    await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+    await send({'type': 'http.response.body', 'body': response['body']})
@@ -0,0 +1,253 @@
+# benchmark.py - Performance checks for the TMS application
+#
+# Run with:  python benchmark.py json [--rows 100000]
+#            python benchmark.py startup [--runs 5]
+#            python benchmark.py integrity [--rows 1000000]
+#            python benchmark.py snapshots [--rows 1000000] [--workers 4]
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_otr_frame(rows):
+    """OTR repairs shaped DataFrame with missing values, numbers and booleans"""
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'otr_id': [f"otr{i:07d}" for i in range(rows)],
+        'truck_id': [f"t{i % 500:03d}" for i in range(rows)],
+        'driver_id': [f"d{i % 800:03d}" for i in range(rows)],
+        'breakdown_date': pd.date_range('2015-01-01', periods=rows, freq='h').strftime('%Y-%m-%d'),
+        'location': rng.choice(['Dallas, TX', 'Houston, TX', 'Denver, CO'], rows),
+        'issue_description': 'Air leak in brake chamber, replaced chamber and hoses',
+        'repair_cost': rng.random(rows) * 2000,
+        'downtime_hours': rng.integers(1, 72, rows),
+        'total_cost': rng.random(rows) * 2500,
+        'insurance_claim': rng.random(rows) > 0.8,
+        'notes': np.where(rng.random(rows) > 0.5, 'Driver reported at fuel stop', None),
+        'created_at': pd.Timestamp('2025-01-01T08:00:00'),
+    })
+    df.loc[::7, 'repair_cost'] = np.nan
+    return df
+
+
+def timed(label, rows, encode, repeat=3):
+    """Best of repeat runs of encode(), printed as time and records per second"""
+    best = None
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(encode())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<34} {best * 1000:8.1f} ms  {rows / best:12,.0f} records/s  {size / 1e6:6.1f} MB")
+
+
+def bench_json(rows):
+    """Throughput of the /api and /export JSON encoders"""
+    import app
+
+    df = synthetic_otr_frame(rows)
+    print(f"Encoding {rows:,} OTR records (orjson {'available' if app.orjson else 'not installed'})")
+
+    timed('stdlib json of to_dict records', rows,
+          lambda: json.dumps(df.to_dict('records'), default=str).encode('utf-8'))
+    if app.orjson is not None:
+        timed('orjson of row dicts', rows,
+              lambda: app.orjson.dumps(app.frame_rows(df), default=app.json_default,
+                                       option=app.orjson.OPT_SERIALIZE_NUMPY))
+    timed('encode_json', rows, lambda: app.encode_json(df))
+    timed('encode_json of an export', rows, lambda: app.encode_json({'export_date': 'now', 'otr_repairs': df}))
+
+
+# Runs in a fresh interpreter; prints the timings of one cold start as JSON
+STARTUP_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import app
+imported = time.perf_counter()
+if {warm_up!r}:
+    app.create_app(warm_up=True)
+    app.warm_up_thread.join()
+ready = time.perf_counter()
+status = app.app.test_client().get('/').status_code
+done = time.perf_counter()
+print(json.dumps({{'import': imported - started, 'warm_up': ready - imported,
+                  'first_request': done - ready, 'status': status}}))
+'''
+
+
+def bench_startup(runs):
+    """Cold-start time: module import and first dashboard request, in fresh processes"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as workdir:
+        # The app resolves tms_data/ against the working directory
+        if os.path.isdir(os.path.join(root, 'tms_data')):
+            shutil.copytree(os.path.join(root, 'tms_data'), os.path.join(workdir, 'tms_data'))
+
+        print(f"Cold start, median of {runs} runs")
+        for warm_up in (False, True):
+            probe = STARTUP_PROBE.format(root=root, warm_up=warm_up)
+            timings = []
+            for _ in range(runs):
+                result = subprocess.run([sys.executable, '-c', probe], cwd=workdir,
+                                        capture_output=True, text=True, check=True)
+                timings.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+            def median_ms(key):
+                return statistics.median(timing[key] for timing in timings) * 1000
+
+            label = 'with warm-up' if warm_up else 'lazy'
+            print(f"{label:<14} import {median_ms('import'):7.1f} ms  warm-up {median_ms('warm_up'):7.1f} ms  "
+                  f"first request {median_ms('first_request'):7.1f} ms")
+
+
+def bench_integrity(rows):
+    """Referential integrity check over a synthetic OTR table: parsing CSVs, from snapshots and in memory"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copytree(os.path.join(root, 'tms_data'), os.path.join(workdir, 'tms_data'))
+        os.chdir(workdir)
+        sys.path.insert(0, root)
+        import app
+        app.data_manager.ensure_ready()
+
+        # Every breakdown points at an existing truck and driver, except one in 1000
+        df = synthetic_otr_frame(rows)
+        trucks = app.data_manager.load_data(app.TRUCKS_FILE)['truck_id'].tolist()
+        drivers = app.data_manager.load_data(app.DRIVERS_FILE)['driver_id'].tolist()
+        df['truck_id'] = [trucks[i % len(trucks)] for i in range(rows)]
+        df['driver_id'] = [drivers[i % len(drivers)] for i in range(rows)]
+        df.loc[::1000, 'truck_id'] = 'missing'
+        df.to_csv(app.OTR_FILE, index=False)
+        print(f"Checking references of {rows:,} OTR records ({2 * rows:,} references)")
+
+        start = time.perf_counter()
+        summary = app.write_integrity_report()
+        elapsed = time.perf_counter() - start
+        print(f"{'read CSVs and check':<34} {elapsed * 1000:8.1f} ms  {summary['orphans']:,} orphans")
+
+        if app.TABLE_SNAPSHOTS:
+            # Let the snapshots queued by the first check be published
+            if app.data_manager.snapshots.pool is not None:
+                app.data_manager.snapshots.pool.shutdown(wait=True)
+                app.data_manager.snapshots.pool = None
+            start = time.perf_counter()
+            summary = app.write_integrity_report()
+            elapsed = time.perf_counter() - start
+            print(f"{'map snapshots and check':<34} {elapsed * 1000:8.1f} ms  {summary['orphans']:,} orphans")
+
+        # The same check with the tables already in memory, as after /import
+        tables = {app.data_manager.cache_key(path): app.data_manager.load_data(path)
+                  for path in app.TABLE_FILES.values()}
+        token = app.prefetched_tables.set(tables)
+        try:
+            start = time.perf_counter()
+            orphans_df, _ = app.find_orphans()
+            elapsed = time.perf_counter() - start
+        finally:
+            app.prefetched_tables.reset(token)
+        print(f"{'check in memory (after /import)':<34} {elapsed * 1000:8.1f} ms  {2 * rows / elapsed:12,.0f} references/s")
+        os.chdir(root)
+
+
+# Runs in a fresh interpreter (one "worker"); prints its table load time and resident
+# memory as JSON: before loading, while one load's frames are held, and once five
+# loads have come and gone (steady state). RssAnon is private to the worker,
+# RssFile is page cache that every worker mapping the same snapshot files shares
+# (Linux /proc only).
+SNAPSHOT_PROBE = '''
+import gc, json, sys, time
+sys.path.insert(0, {root!r})
+import app
+
+def memory():
+    found = {{}}
+    with open('/proc/self/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('RssAnon', 'RssFile'):
+                found[name] = int(value.split()[0]) / 1024
+    return found
+
+app.data_manager.ensure_ready()
+baseline = memory()['RssAnon']
+started = time.perf_counter()
+frames = app.data_manager.load_many(list(app.TABLE_FILES.values()))
+loaded = time.perf_counter()
+held = memory()
+for _ in range(4):
+    del frames
+    frames = app.data_manager.load_many(list(app.TABLE_FILES.values()))
+del frames
+gc.collect()
+print(json.dumps(dict(memory(), baseline=baseline, held=held['RssAnon'], load=loaded - started)))
+'''
+
+
+def bench_snapshots(rows, workers):
+    """Per-worker load time and memory of every table, parsing CSVs vs mapping shared snapshots"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copytree(os.path.join(root, 'tms_data'), os.path.join(workdir, 'tms_data'))
+        synthetic_otr_frame(rows).to_csv(os.path.join(workdir, 'tms_data', 'otr_repairs.csv'), index=False)
+        probe = SNAPSHOT_PROBE.format(root=root)
+
+        def run_worker(snapshots):
+            env = dict(os.environ, TMS_TABLE_SNAPSHOTS='1' if snapshots else '0')
+            result = subprocess.run([sys.executable, '-c', probe], cwd=workdir, env=env,
+                                    capture_output=True, text=True, check=True)
+            return json.loads(result.stdout.strip().splitlines()[-1])
+
+        print(f"Loading every table ({rows:,} OTR records) in {workers} worker processes")
+        # The first worker parses the CSVs and queues the snapshots, which are published before it exits
+        for label, snapshots in (('parse CSVs', False), ('first worker publishes', True), ('mapped snapshots', True)):
+            timings = [run_worker(snapshots) for _ in range(1 if label == 'first worker publishes' else workers)]
+            load_ms = statistics.median(timing['load'] for timing in timings) * 1000
+            baseline_mb = statistics.median(timing['baseline'] for timing in timings)
+            held_mb = statistics.median(timing['held'] for timing in timings)
+            steady_mb = statistics.median(timing['RssAnon'] for timing in timings)
+            file_mb = statistics.median(timing['RssFile'] for timing in timings)
+            print(f"{label:<24} load {load_ms:8.1f} ms  private: before {baseline_mb:6.1f} MB, "
+                  f"loaded {held_mb:6.1f} MB, steady {steady_mb:6.1f} MB  shared files {file_mb:6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TMS performance benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    json_parser = commands.add_parser('json', help='JSON encoding throughput for /api and /export')
+    json_parser.add_argument('--rows', type=int, default=100000)
+
+    startup_parser = commands.add_parser('startup', help='Cold-start time of the app module')
+    startup_parser.add_argument('--runs', type=int, default=5)
+
+    integrity_parser = commands.add_parser('integrity', help='Referential integrity check time')
+    integrity_parser.add_argument('--rows', type=int, default=1000000)
+
+    snapshots_parser = commands.add_parser('snapshots', help='Per-worker table load time with shared snapshots')
+    snapshots_parser.add_argument('--rows', type=int, default=1000000)
+    snapshots_parser.add_argument('--workers', type=int, default=4)
+
+    args = parser.parse_args()
+    if args.command == 'json':
+        bench_json(args.rows)
+    elif args.command == 'startup':
+        bench_startup(args.runs)
+    elif args.command == 'integrity':
+        bench_integrity(args.rows)
+    elif args.command == 'snapshots':
+        bench_snapshots(args.rows, args.workers)
+
+
+if __name__ == '__main__':
+    main()
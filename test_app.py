@@ -0,0 +1,326 @@
+# test_app.py - Checks of the app's data structures against brute-force results
+#
+# Run with:  python -m pytest -q
+import json
+import os
+import random
+import shutil
+import threading
+from datetime import datetime
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Empty tms_data/ in a temporary working directory (DATA_DIR is relative).
+
+    Snapshots are off unless a test turns them on, so loads publish no
+    snapshots in the background.
+    """
+    app.data_manager.ensure_ready()
+    monkeypatch.setattr(app, 'TABLE_SNAPSHOTS', False)
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(app.DATA_DIR)
+    app.data_manager.ensure_files_exist()
+    return tmp_path
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for item in range(500):
+        start = rng.randint(0, 1000)
+        intervals.append((start, start + rng.randint(0, 60), item))
+    tree = app.IntervalTree(intervals)
+
+    for _ in range(300):
+        start = rng.randint(-20, 1080)
+        end = start + rng.randint(0, 80)
+        expected = {item for first, last, item in intervals if first <= end and last >= start}
+        found = tree.overlap(start, end)
+        assert len(found) == len(expected)
+        assert set(found) == expected
+
+
+def test_interval_tree_empty():
+    assert app.IntervalTree([]).overlap(0, 10) == []
+
+
+def otr_records(rng, count, first_id=0):
+    """OTR breakdowns shaped like add_otr records, some undated or for unknown trucks"""
+    issues = ['Flat tire on steer axle', 'Brake chamber leak', 'DEF sensor fault', 'Alternator failed',
+              'Coolant hose burst', 'Windshield cracked']
+    records = []
+    for index in range(first_id, first_id + count):
+        day = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        records.append({
+            'otr_id': f"otr{index}",
+            'truck_id': rng.choice(['t001', 't002', 't003', 't004', 'gone']),
+            'breakdown_date': day if rng.random() > 0.05 else '',
+            'issue_description': rng.choice(issues),
+            'downtime_hours': float(rng.randint(0, 48)),
+            'total_cost': round(rng.random() * 3000, 2),
+        })
+    return records
+
+
+def fleet_trucks():
+    """The trucks otr_records refers to (all but 'gone')"""
+    return app.pd.DataFrame({
+        'truck_id': ['t001', 't002', 't003', 't004'],
+        'truck_number': ['101', '102', '103', '104'],
+        'make': ['Freightliner', 'Volvo', 'Volvo', None],
+        'model': ['Cascadia', 'VNL', 'VNL', None],
+        'engine_type': ['Detroit DD15', 'D13', 'D13', ''],
+    })
+
+
+def test_reliability_fold_matches_full_rebuild():
+    rng = random.Random(11)
+    trucks_df = fleet_trucks()
+    base = otr_records(rng, 300)
+    batches = [otr_records(rng, rng.randint(1, 40), first_id=1000 * batch) for batch in range(1, 60)]
+
+    folded = app.FleetReliability(app.pd.DataFrame(base))
+    for batch in batches:
+        folded = app.FleetReliability(app.pd.DataFrame(batch), base=folded)
+    rebuilt = app.FleetReliability(app.pd.DataFrame(base + [record for batch in batches for record in batch]))
+
+    assert folded.report(trucks_df) == rebuilt.report(trucks_df)
+
+
+def write_otr_table(rng, count):
+    """Write count breakdowns (from otr_records) to the OTR table file and return them"""
+    df = app.pd.DataFrame(otr_records(rng, count)).reindex(columns=app.OTR_COLUMNS)
+    df.to_csv(app.OTR_FILE, index=False)
+    return app.pd.read_csv(app.OTR_FILE)
+
+
+def test_reliability_load_during_insert_is_not_folded_twice(data_dir, monkeypatch):
+    rng = random.Random(13)
+    write_otr_table(rng, 200)
+    monkeypatch.setattr(app, 'change_log', app.TMSChangeLog())
+    monkeypatch.setattr(app, 'fleet_reliability', {})
+    record_change = app.change_log.record
+
+    # A reader arrives between the row being appended and its version being recorded
+    readers = []
+    def record_after_read(*args, **kwargs):
+        reader = threading.Thread(target=app.get_fleet_reliability)
+        reader.start()
+        reader.join(timeout=0.5)
+        readers.append(reader)
+        return record_change(*args, **kwargs)
+    monkeypatch.setattr(app.change_log, 'record', record_after_read)
+    assert app.insert_record('otr_repairs', otr_records(rng, 1, first_id=5000)[0])
+    readers[0].join()
+
+    folded = app.get_fleet_reliability()
+    rebuilt = app.FleetReliability(app.data_manager.load_data(app.OTR_FILE, columns=app.RELIABILITY_COLUMNS))
+    assert folded.report(fleet_trucks()) == rebuilt.report(fleet_trucks())
+
+
+def test_snapshot_round_trip(tmp_path):
+    df = app.pd.DataFrame({
+        'text': ['a', None, 'b', 'a', 'é中'],
+        'count': [1, 2, 3, 4, 5],
+        'cost': [1.5, float('nan'), 2.0, 3.25, 0.0],
+        'flag': [True, False, True, True, False],
+    })
+    path = str(tmp_path / 'snapshot')
+    app.TMSTableSnapshots(None, str(tmp_path)).publish(df, path)
+    snapshot = app.TableSnapshot(path)
+
+    # Nothing in a snapshot needs unpickling
+    for name in os.listdir(path):
+        if name.endswith('.npy'):
+            app.np.load(os.path.join(path, name), allow_pickle=False)
+    assert snapshot.frame().equals(df)
+    assert (snapshot.frame().dtypes == df.dtypes).all()
+    expected = df[df['text'].isin(['a', 'b'])][['text', 'cost']].reset_index(drop=True)
+    assert snapshot.frame(['text', 'cost'], {'text': ['a', 'b']}).equals(expected)
+    assert snapshot.frame(None, {'count': 3}).equals(df[df['count'] == 3].reset_index(drop=True))
+
+    # Frames share the snapshot's columns, but writing to one leaves the snapshot alone
+    frame = snapshot.frame()
+    frame.loc[0, 'text'] = 'changed'
+    frame.loc[0, 'count'] = 99
+    assert snapshot.frame().equals(df)
+
+
+def test_snapshot_loads_match_csv_loads(data_dir, monkeypatch):
+    rng = random.Random(5)
+    write_otr_table(rng, 2000)
+    monkeypatch.setattr(app, 'PARTITION_TARGET_ROWS', 300)
+    app.data_manager.compact_partitions(app.OTR_FILE)
+
+    queries = [
+        {},
+        {'date_from': '2024-03-01', 'date_to': '2024-05-31'},
+        {'date_from': '2024-11-15', 'where': {'truck_id': ['t001', 'gone']}},
+        {'columns': ['otr_id', 'total_cost'], 'where': {'truck_id': 't002'}},
+    ]
+    expected = [app.data_manager.load_data(app.OTR_FILE, **query).reset_index(drop=True) for query in queries]
+
+    monkeypatch.setattr(app, 'TABLE_SNAPSHOTS', True)
+    for _, path in app.data_manager.table_files(app.OTR_FILE):
+        assert app.data_manager.snapshots.publish_file(path) is not None
+
+    def no_csv(*args):
+        raise AssertionError('CSV file parsed although its snapshot is published')
+    monkeypatch.setattr(app.data_manager, 'read_file', no_csv)
+    for query, csv_df in zip(queries, expected):
+        snapshot_df = app.data_manager.load_data(app.OTR_FILE, **query).reset_index(drop=True)
+        assert snapshot_df.equals(csv_df), query
+
+
+def test_snapshot_chunks_match_csv_chunks(data_dir, monkeypatch):
+    rng = random.Random(8)
+    write_otr_table(rng, 1000)
+    query = {'date_from': '2024-02-01', 'where': {'truck_id': ['t001', 't003']}, 'chunk_rows': 7}
+
+    # CSV chunks are cut before filtering and snapshot chunks after, so only the rows must match
+    def chunks():
+        chunks = list(app.data_manager.iter_chunks(app.OTR_FILE, **query))
+        assert len(chunks) > 1 and all(len(chunk) <= 7 for chunk in chunks)
+        return app.pd.concat(chunks, ignore_index=True)
+    expected = chunks()
+
+    monkeypatch.setattr(app, 'TABLE_SNAPSHOTS', True)
+    assert app.data_manager.snapshots.publish_file(app.OTR_FILE) is not None
+    def no_csv(*args, **kwargs):
+        raise AssertionError('CSV file parsed although its snapshot is published')
+    monkeypatch.setattr(app.data_manager, 'read_chunks', no_csv)
+    assert chunks().equals(expected)
+
+    repairs = list(app.data_manager.iter_rows(app.OTR_FILE, app.OTRRepair, where={'truck_id': 't001'}))
+    assert repairs and all(isinstance(repair, app.OTRRepair) and repair.truck_id == 't001' for repair in repairs)
+
+
+def test_compaction_keeps_every_row(data_dir, monkeypatch):
+    rng = random.Random(3)
+    original = write_otr_table(rng, 1500)
+    monkeypatch.setattr(app, 'PARTITION_TARGET_ROWS', 250)
+    app.data_manager.compact_partitions(app.OTR_FILE)
+    # Appends land in the partition covering their month; a second pass merges further
+    app.data_manager.append_record(app.OTR_FILE, {'otr_id': 'late', 'truck_id': 't001',
+                                                  'breakdown_date': '2024-06-30'})
+    monkeypatch.setattr(app, 'PARTITION_TARGET_ROWS', 600)
+    summary = app.data_manager.compact_partitions(app.OTR_FILE)
+
+    partitions = app.data_manager.partitions(app.OTR_FILE)
+    assert summary == {'company': len(partitions)}
+    assert sorted(app.data_manager.load_data(app.OTR_FILE)['otr_id']) == sorted(list(original['otr_id']) + ['late'])
+
+    # Only undated rows stay in the table file; partitions cover disjoint month ranges
+    assert app.pd.read_csv(app.OTR_FILE)['breakdown_date'].isna().all()
+    previous_end = ''
+    for start_month, end_month, path in partitions:
+        assert previous_end < start_month <= end_month
+        months = app.pd.read_csv(path)['breakdown_date'].str[:7]
+        assert months.between(start_month, end_month).all()
+        previous_end = end_month
+
+
+def test_incremental_backup_round_trip(data_dir, monkeypatch):
+    monkeypatch.setattr(app, 'change_log', app.TMSChangeLog())
+    os.makedirs(app.UPLOAD_FOLDER)
+
+    def add_driver(index):
+        assert app.insert_record('drivers', {'driver_id': f"d{index:03d}", 'first_name': 'Pat', 'last_name': f"Driver {index}",
+                                             'driver_type': 'Company', 'status': 'Active',
+                                             'created_at': datetime.now().isoformat()})
+    for index in range(5):
+        add_driver(index)
+
+    # One driver is added while the base backup is loading, another right after it
+    load_many = app.data_manager.load_many
+    def load_while_adding(*args, **kwargs):
+        frames = load_many(*args, **kwargs)
+        add_driver(5)
+        return frames
+    monkeypatch.setattr(app.data_manager, 'load_many', load_while_adding)
+    base = app.export_job(lambda *args: None)['file']
+    monkeypatch.setattr(app.data_manager, 'load_many', load_many)
+    add_driver(6)
+    incremental = app.export_job(lambda *args: None, app.parse_backup_since(base))['file']
+    live = app.data_manager.load_data(app.DRIVERS_FILE)
+
+    # Restore base + incremental into an empty data directory
+    restore_dir = data_dir / 'restore'
+    os.makedirs(restore_dir / app.DATA_DIR)
+    os.makedirs(restore_dir / app.UPLOAD_FOLDER)
+    for name in (base, incremental):
+        shutil.copy(os.path.join(app.UPLOAD_FOLDER, name), restore_dir / app.UPLOAD_FOLDER / name)
+    monkeypatch.chdir(restore_dir)
+    app.data_manager.ensure_files_exist()
+    for name in (base, incremental):
+        app.import_job(lambda *args: None, os.path.join(app.UPLOAD_FOLDER, name))
+
+    restored = app.data_manager.load_data(app.DRIVERS_FILE)
+    assert sorted(restored['driver_id']) == [f"d{index:03d}" for index in range(7)]
+    assert restored.sort_values('driver_id', ignore_index=True).equals(live.sort_values('driver_id', ignore_index=True))
+
+
+# Tables with known broken references: (table, record_id, column, value) of each orphan
+REFERENCE_TABLES = {
+    'drivers': [{'driver_id': 'd1', 'first_name': 'Ann', 'last_name': 'Lee'},
+                {'driver_id': 'd2', 'first_name': 'Bo', 'last_name': 'Park'}],
+    'trucks': [{'truck_id': 't1', 'truck_number': 'T8001', 'assigned_driver': 'Ann Lee'},
+               {'truck_id': 't2', 'truck_number': 'T8002', 'assigned_driver': 'Cy Dunn'},
+               {'truck_id': 't3', 'truck_number': 'T8003', 'assigned_driver': ' '}],
+    'trailers': [{'trailer_id': 'tr1', 'trailer_number': 'TR1', 'assigned_truck': 'T8001'},
+                 {'trailer_id': 'tr2', 'trailer_number': 'TR2', 'assigned_truck': 'T9999'},
+                 {'trailer_id': 'tr3', 'trailer_number': 'TR3', 'assigned_truck': None}],
+    'otr_repairs': [{'otr_id': 'o1', 'truck_id': 't1', 'driver_id': 'd1', 'breakdown_date': '2024-05-01'},
+                    {'otr_id': 'o2', 'truck_id': 't9', 'driver_id': 'd2', 'breakdown_date': '2024-05-02'},
+                    {'otr_id': 'o3', 'truck_id': 't2', 'driver_id': 'd7', 'breakdown_date': '2024-05-03'}],
+    'shop_jobs': [{'job_id': 'j1', 'truck_id': 't3', 'trailer_id': 'tr9'},
+                  {'job_id': 'j2', 'truck_id': 't1', 'trailer_id': None}],
+}
+REFERENCE_ORPHANS = {
+    ('trucks', 't2', 'assigned_driver', 'Cy Dunn'),
+    ('trailers', 'tr2', 'assigned_truck', 'T9999'),
+    ('otr_repairs', 'o2', 'truck_id', 't9'),
+    ('otr_repairs', 'o3', 'driver_id', 'd7'),
+    ('shop_jobs', 'j1', 'trailer_id', 'tr9'),
+}
+
+
+def orphan_set(orphans_df):
+    return {tuple(row) for row in orphans_df[['table', 'record_id', 'column', 'value']].itertuples(index=False)}
+
+
+def test_find_orphans_reports_known_orphans(data_dir):
+    for table, records in REFERENCE_TABLES.items():
+        app.pd.DataFrame(records).to_csv(app.TABLE_FILES[table], index=False)
+
+    orphans_df, references = app.find_orphans()
+    assert orphan_set(orphans_df) == REFERENCE_ORPHANS
+    counts = {(reference['table'], reference['column']): (reference['checked'], reference['orphans'])
+              for reference in references}
+    # Blank and missing references are not checked
+    assert counts[('trucks', 'assigned_driver')] == (2, 1)
+    assert counts[('trailers', 'assigned_truck')] == (2, 1)
+    assert counts[('shop_jobs', 'trailer_id')] == (1, 1)
+    assert counts[('maintenance', 'truck_id')] == (0, 0)
+
+
+def test_import_checks_references_without_reading_tables(data_dir, monkeypatch):
+    os.makedirs(app.UPLOAD_FOLDER)
+    backup = {table: REFERENCE_TABLES.get(table, []) for table in app.TABLE_FILES}
+    backup_file = os.path.join(app.UPLOAD_FOLDER, 'backup.json')
+    with open(backup_file, 'w') as f:
+        json.dump(backup, f)
+    monkeypatch.setattr(app, 'change_log', app.TMSChangeLog())
+
+    def no_csv(*args):
+        raise AssertionError('imported table read back from disk')
+    monkeypatch.setattr(app.data_manager, 'read_file', no_csv)
+    result = app.import_job(lambda *args: None, backup_file)
+
+    assert result['orphans'] == len(REFERENCE_ORPHANS)
+    assert orphan_set(app.pd.read_csv(app.ORPHANS_FILE)) == REFERENCE_ORPHANS